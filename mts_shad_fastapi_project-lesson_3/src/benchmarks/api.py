@@ -0,0 +1,403 @@
+"""Нагрузочный бенчмарк ручек v1 (книги и продавцы).
+
+Наполняет БД продавцами и книгами, гоняет каждую ручку с заданной параллельностью
+и считает задержку (p50/p95/p99) и число запросов в секунду.
+
+Транспорты:
+- asgi: запросы идут в приложение напрямую через httpx.ASGITransport, без сети и сервера;
+- uvicorn: поднимается отдельный процесс uvicorn, запросы идут по HTTP.
+
+Результаты сохраняются в JSON, два прогона можно сравнить командой compare:
+она завершается с кодом 1, если какая-то ручка стала медленнее порога.
+
+ВНИМАНИЕ: бенчмарк очищает таблицы книг и продавцов. Поэтому он работает только с отдельной базой
+из DB_BENCHMARK_NAME (см. use_benchmark_database) и без нее не запускается.
+
+Запуск из папки src:
+    python -m benchmarks.api run --transport asgi --requests 500 --concurrency 32 --output base.json
+    python -m benchmarks.api run --transport uvicorn --workers 2 --output new.json
+    python -m benchmarks.api compare base.json new.json --threshold 10
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional
+
+import httpx
+import orjson
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import configurations.database as database
+from configurations.database import global_init
+from configurations.settings import settings
+from models.base import BaseModel
+from models.books import Book
+from models.seller_stats import SellerStats
+from models.sellers import Seller
+from services.passwords import PasswordHasher
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+API = "/api/v1"
+AUTHORS = 100  # книги раскладываются по AUTHORS авторам, чтобы поиск возвращал не пустой и не весь каталог
+BULK_SIZE = 100  # книг в одном запросе на массовое создание
+
+
+# Сценарий - одна ручка. i - порядковый номер запроса, из него строятся путь и тело,
+# чтобы прогоны были воспроизводимыми.
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[int], str]
+    body: Optional[Callable[[int], Any]] = None
+    status: int = 200
+    max_requests: Optional[int] = None  # для тяжелых ручек (выгрузка каталога) ограничиваем число запросов
+
+
+def build_scenarios(sellers: int, books: int, requests: int) -> list[Scenario]:
+    def book_id(i: int) -> int:
+        return 1 + (i * 7919) % books
+
+    def seller_id(i: int) -> int:
+        return 1 + (i * 7919) % sellers
+
+    def book(i: int) -> dict:
+        return {
+            "title": f"Benchmark book {i}",
+            "author": f"Author {i % AUTHORS}",
+            "year": 1900 + i % 120,
+            "count_pages": 100 + i % 500,
+            "seller_id": seller_id(i),
+        }
+
+    def seller(i: int, prefix: str = "created") -> dict:
+        return {
+            "first_name": f"First {i}",
+            "last_name": f"Last {i}",
+            "email": f"{prefix}-{i}@mail.ru",
+            "password": "benchmark-password",
+        }
+
+    # Создание идет до удаления: удаляются как раз книги и продавцы, созданные ручками создания,
+    # поэтому посеянные данные остаются одинаковыми для всех ручек чтения.
+    return [
+        Scenario("books.list", "GET", lambda i: f"{API}/books/?limit=100"),
+        Scenario("books.list_page", "GET", lambda i: f"{API}/books/?limit=100&after={book_id(i)}"),
+        Scenario("books.get", "GET", lambda i: f"{API}/books/{book_id(i)}"),
+        Scenario(
+            "books.batch", "GET", lambda i: f"{API}/books/batch?" + "&".join(f"ids={book_id(i + k)}" for k in range(20))
+        ),
+        Scenario("books.search", "GET", lambda i: f"{API}/books/search?author=Author%20{i % AUTHORS}&limit=20"),
+        Scenario("books.export", "GET", lambda i: f"{API}/books/export", max_requests=max(1, requests // 50)),
+        Scenario("books.create", "POST", lambda i: f"{API}/books/", body=book, status=201),
+        Scenario(
+            "books.bulk",
+            "POST",
+            lambda i: f"{API}/books/bulk",
+            body=lambda i: [book(i * BULK_SIZE + j) for j in range(BULK_SIZE)],
+            status=201,
+            max_requests=max(1, requests // 10),
+        ),
+        Scenario(
+            "books.update", "PUT", lambda i: f"{API}/books/{book_id(i)}", body=lambda i: {**book(i), "id": book_id(i)}
+        ),
+        Scenario("books.patch", "PATCH", lambda i: f"{API}/books/{book_id(i)}", body=lambda i: {"count_pages": i + 1}),
+        Scenario("sellers.list", "GET", lambda i: f"{API}/sellers/?limit=100"),
+        Scenario("sellers.list_page", "GET", lambda i: f"{API}/sellers/?limit=100&after={seller_id(i)}"),
+        Scenario("sellers.get", "GET", lambda i: f"{API}/sellers/{seller_id(i)}"),
+        Scenario("sellers.stats", "GET", lambda i: f"{API}/sellers/{seller_id(i)}/stats"),
+        Scenario("sellers.leaderboard", "GET", lambda i: f"{API}/sellers/leaderboard?limit=20"),
+        Scenario("sellers.create", "POST", lambda i: f"{API}/sellers/", body=seller, status=201),
+        Scenario(
+            "sellers.update", "PUT", lambda i: f"{API}/sellers/{seller_id(i)}", body=lambda i: seller(i, "updated")
+        ),
+        Scenario(
+            "sellers.patch",
+            "PATCH",
+            lambda i: f"{API}/sellers/{seller_id(i)}",
+            body=lambda i: {"last_name": f"Patched {i}"},
+        ),
+        Scenario("books.delete", "DELETE", lambda i: f"{API}/books/{books + 1 + i}", status=204),
+        Scenario("sellers.delete", "DELETE", lambda i: f"{API}/sellers/{sellers + 1 + i}", status=204),
+    ]
+
+
+# База бенчмарка. Бенчмарки очищают таблицы, поэтому основная база приложения (DB_NAME) не годится:
+# без отдельной DB_BENCHMARK_NAME бенчмарк не запускается. Приложение под нагрузкой переключается на ту же базу -
+# в этом процессе (global_init) и в дочерних процессах сервера (через переменную окружения DB_NAME).
+def use_benchmark_database() -> str:
+    if not settings.db_benchmark_name or settings.db_benchmark_name in (settings.db_name, settings.db_test_name):
+        raise SystemExit(
+            "Benchmarks truncate the books and sellers tables: set DB_BENCHMARK_NAME to a dedicated database "
+            "(not DB_NAME or DB_TEST_NAME)"
+        )
+    os.environ["DB_NAME"] = settings.db_benchmark_name
+    database.SQLALCHEMY_DATABASE_URL = settings.database_benchmark_url
+    return settings.database_benchmark_url
+
+
+# Очищаем таблицы и вставляем продавцов и книги пачками. Пароль у всех продавцов один, хешируем его один раз.
+async def seed(sellers: int, books: int) -> None:
+    engine = create_async_engine(use_benchmark_database())
+    password = PasswordHasher(
+        n=settings.password_hash_n, r=settings.password_hash_r, p=settings.password_hash_p, workers=1
+    ).hash_sync("benchmark-password")
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(BaseModel.metadata.create_all)
+            await connection.execute(
+                text(f"TRUNCATE {Book.__tablename__}, {Seller.__tablename__} RESTART IDENTITY CASCADE")
+            )
+            await connection.execute(
+                insert(Seller),
+                [
+                    {
+                        "first_name": f"First {i}",
+                        "last_name": f"Last {i}",
+                        "email": f"seller-{i}@mail.ru",
+                        "password": password,
+                    }
+                    for i in range(sellers)
+                ],
+            )
+            await connection.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Book {i}",
+                        "author": f"Author {i % AUTHORS}",
+                        "year": 1900 + i % 120,
+                        "count_pages": 100 + i % 500,
+                        "seller_id": 1 + i % sellers,
+                    }
+                    for i in range(books)
+                ],
+            )
+            await connection.execute(
+                text(f"ANALYZE {Book.__tablename__}, {Seller.__tablename__}, {SellerStats.__tablename__}")
+            )
+    finally:
+        await engine.dispose()
+
+
+# Перцентиль по методу ближайшего ранга
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int) -> dict:
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p95_ms": percentile(latencies_ms, 95),
+        "p99_ms": percentile(latencies_ms, 99),
+        "max_ms": max(latencies_ms, default=0.0),
+    }
+
+
+# Гоняем сценарий: concurrency корутин разбирают номера запросов из общего итератора.
+# Ошибкой считается любой ответ со статусом, отличным от ожидаемого.
+async def drive(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    numbers = iter(range(requests))
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in numbers:
+            body = orjson.dumps(scenario.body(i)) if scenario.body else None
+            started = time.perf_counter()
+            response = await client.request(
+                scenario.method, scenario.path(i), content=body, headers={"Content-Type": "application/json"}
+            )
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != scenario.status:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+@asynccontextmanager
+async def asgi_client(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    from main import app
+
+    # ASGITransport не запускает lifespan приложения, поэтому инициализируем БД сами
+    global_init()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            args.host,
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=SRC_DIR,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{args.host}:{args.port}", limits=limits, timeout=60) as client:
+            await _wait_ready(client, process)
+            yield client
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+async def _wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            await client.get("/openapi.json")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+TRANSPORTS = {"asgi": asgi_client, "uvicorn": uvicorn_client}
+
+
+def _git_commit() -> Optional[str]:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    # До запуска сервера: дочерний процесс uvicorn должен получить базу бенчмарка
+    use_benchmark_database()
+    scenarios = build_scenarios(args.sellers, args.books, args.requests)
+    if args.only:
+        scenarios = [scenario for scenario in scenarios if scenario.name.startswith(tuple(args.only))]
+
+    results = {
+        "meta": {
+            "transport": args.transport,
+            "workers": args.workers if args.transport == "uvicorn" else None,
+            "sellers": args.sellers,
+            "books": args.books,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": {},
+    }
+
+    async with TRANSPORTS[args.transport](args) as client:
+        await seed(args.sellers, args.books)
+        for scenario in scenarios:
+            requests = min(args.requests, scenario.max_requests or args.requests)
+            # Прогрев только для чтения: запросы на запись сдвинули бы id, на которые рассчитаны сценарии
+            if scenario.method == "GET" and args.warmup:
+                await drive(client, scenario, min(args.warmup, requests), args.concurrency)
+            stats = await drive(client, scenario, requests, args.concurrency)
+            results["scenarios"][scenario.name] = stats
+            print(
+                f"{scenario.name:<20}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['errors']:>8}"
+            )
+
+    return results
+
+
+def _change(base: float, new: float) -> float:
+    return (new - base) / base * 100 if base else 0.0
+
+
+# Сравнение двух прогонов. Регрессия - рост p95 или падение RPS больше чем на threshold процентов,
+# либо новые ошибки.
+def compare_results(base: dict, new: dict, threshold: float) -> list[dict]:
+    rows = []
+    for name, new_stats in new["scenarios"].items():
+        if (base_stats := base["scenarios"].get(name)) is None:
+            continue
+        p95_change = _change(base_stats["p95_ms"], new_stats["p95_ms"])
+        rps_change = _change(base_stats["rps"], new_stats["rps"])
+        regression = p95_change > threshold or rps_change < -threshold or new_stats["errors"] > base_stats["errors"]
+        rows.append({"name": name, "p95_change": p95_change, "rps_change": rps_change, "regression": regression})
+    return rows
+
+
+def compare(args: argparse.Namespace) -> int:
+    base = orjson.loads(Path(args.base).read_bytes())
+    new = orjson.loads(Path(args.new).read_bytes())
+    rows = compare_results(base, new, args.threshold)
+
+    print(f"{'scenario':<20}{'p95, %':>10}{'rps, %':>10}")
+    for row in rows:
+        mark = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<20}{row['p95_change']:>+10.1f}{row['rps_change']:>+10.1f}{mark}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="прогнать бенчмарк")
+    run_parser.add_argument("--transport", choices=TRANSPORTS, default="asgi")
+    run_parser.add_argument("--sellers", type=int, default=100)
+    run_parser.add_argument("--books", type=int, default=10000)
+    run_parser.add_argument("--requests", type=int, default=500, help="запросов на каждую ручку")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--warmup", type=int, default=20, help="запросов прогрева для ручек чтения")
+    run_parser.add_argument("--only", nargs="*", help="префиксы сценариев, например books.get sellers")
+    run_parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    run_parser.add_argument("--host", default="127.0.0.1")
+    run_parser.add_argument("--port", type=int, default=8765)
+    run_parser.add_argument("--workers", type=int, default=1)
+
+    compare_parser = commands.add_parser("compare", help="сравнить два прогона")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="допустимое ухудшение, %%")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(compare(args))
+
+    print(f"{'scenario':<20}{'rps':>10}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}{'errors':>8}")
+    results = asyncio.run(run(args))
+    if args.output:
+        Path(args.output).write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
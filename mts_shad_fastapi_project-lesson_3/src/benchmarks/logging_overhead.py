@@ -0,0 +1,82 @@
+"""Бенчмарк стоимости отладочного вывода на горячем пути.
+
+Сравнивает цену одного вызова:
+- ic(obj): icecream разбирает кадр стека и исходный код вызова (так было в ручках удаления);
+- logger.debug(...) при уровне INFO: запись отсекается проверкой уровня;
+- logger.info(...) через очередь: запись уходит в QueueHandler, JSON собирает и пишет фоновый поток.
+
+Вывод направляется в /dev/null, чтобы мерить сам вызов, а не терминал.
+Пакет icecream больше не входит в зависимости проекта; если он не установлен, строка ic пропускается.
+
+Сквозной замер ручки удаления делается общим бенчмарком API:
+    python -m benchmarks.api run --transport uvicorn --workers 1 --only books.create books.delete \
+        --requests 2000 --concurrency 16
+
+Замер DELETE /books/{id} до (ic в ручке) и после (logger.debug) перехода на логирование, медиана трех
+прогонов, 1 ядро, 10 000 книг, вывод сервера в /dev/null:
+    transport  version  rps    p50, ms  p95, ms  p99, ms
+    asgi       ic       159.0  96.8     149.5    219.7
+    asgi       logging  171.4  87.9     143.5    166.6
+    uvicorn    ic       153.9  99.3     136.1    237.2
+    uvicorn    logging  173.4  84.2     123.8    181.6
+
+Запуск из папки src:
+    python -m benchmarks.logging_overhead --calls 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Callable
+
+from configurations.log import setup_logging, stop_logging
+
+
+class _Book:
+    def __init__(self, book_id: int):
+        self.id = book_id
+
+
+def _measure(call: Callable[[int], None], calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        call(i)
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    book = _Book(1)
+    results: dict[str, float] = {}
+
+    devnull = open(os.devnull, "w")
+    try:
+        from icecream import ic
+
+        ic.configureOutput(outputFunction=lambda s: devnull.write(s + "\n"))
+        results["ic(obj)"] = _measure(lambda i: ic(book), args.calls)
+    except ImportError:
+        print("icecream is not installed, skipping ic(obj)", file=sys.stderr)
+
+    stdout, sys.stdout = sys.stdout, devnull
+    setup_logging("INFO", json=True)
+    sys.stdout = stdout
+    logger = logging.getLogger("benchmark")
+
+    results["logger.debug, level INFO"] = _measure(lambda i: logger.debug("Deleted book %s", i), args.calls)
+    results["logger.info via queue"] = _measure(lambda i: logger.info("Deleted book %s", i), args.calls)
+    stop_logging()
+    devnull.close()
+
+    print(f"{'call':<28}{'us per call':>14}{'calls/s':>14}")
+    for name, seconds in results.items():
+        print(f"{name:<28}{seconds * 1e6:>14.2f}{1 / seconds:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Бенчмарк задержки event loop при одновременных регистрациях продавцов.
+
+Запускает N хеширований пароля с заданной параллельностью и параллельно
+меряет, насколько опаздывает короткий asyncio.sleep - это и есть задержка,
+которую в этот момент получили бы все остальные запросы воркера.
+
+Сравниваются два режима:
+- inline: хеш считается прямо в event loop (так было бы без пула потоков);
+- pool: хеш считается в пуле потоков PasswordHasher.
+
+Запуск из папки src:
+    python -m benchmarks.password_hashing --signups 64 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from configurations.settings import settings
+from services.passwords import PasswordHasher
+
+PROBE_INTERVAL = 0.005
+
+
+# Раз в PROBE_INTERVAL засыпаем и записываем, насколько позже запланированного проснулись
+async def _probe_loop_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def _run(mode: str, hasher: PasswordHasher, signups: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def signup(i: int) -> None:
+        async with semaphore:
+            if mode == "pool":
+                await hasher.hash(f"password-{i}")
+            else:
+                hasher.hash_sync(f"password-{i}")
+                await asyncio.sleep(0)
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    probe = asyncio.create_task(_probe_loop_lag(stop, lags))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(signup(i) for i in range(signups)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "mode": mode,
+        "signups_per_sec": signups / elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))],
+        "lag_max_ms": lags_ms[-1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=settings.password_hash_workers)
+    parser.add_argument("--n", type=int, default=settings.password_hash_n)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(n=args.n, r=settings.password_hash_r, p=settings.password_hash_p, workers=args.workers)
+    print(f"{'mode':<8}{'signups/s':>12}{'lag p50, ms':>14}{'lag p99, ms':>14}{'lag max, ms':>14}")
+    for mode in ("inline", "pool"):
+        result = asyncio.run(_run(mode, hasher, args.signups, args.concurrency))
+        print(
+            f"{result['mode']:<8}{result['signups_per_sec']:>12.1f}{result['lag_p50_ms']:>14.2f}"
+            f"{result['lag_p99_ms']:>14.2f}{result['lag_max_ms']:>14.2f}"
+        )
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Бенчмарк сериализации больших списков книг.
+
+Сравнивает два способа собрать ответ из N книг (по умолчанию 10 000):
+- validated: ORM-объекты Book, которые FastAPI проверяет по response_model (ReturnedAllBooks)
+  и только потом отдает в ORJSONResponse (так было в get_all_books);
+- fast: только колонки схемы ответа, словари из строк и сразу orjson (services.serialization).
+
+Для каждого способа меряется время выборки из БД и время сериализации отдельно.
+Проверка по схеме вызывается так же, как ее вызывает FastAPI (fastapi.routing.serialize_response),
+поэтому цифры соответствуют ручке, а не искусственному циклу.
+Ответы обоих способов сверяются: они должны совпадать байт в байт.
+
+ВНИМАНИЕ: как и benchmarks.api, очищает таблицы книг и продавцов, поэтому работает только
+с отдельной базой из DB_BENCHMARK_NAME.
+
+Запуск из папки src:
+    python -m benchmarks.serialization --rows 10000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy import select
+
+from benchmarks.api import seed
+from configurations.database import dispose_engine, get_session_factory, global_init
+from models.books import Book
+from routers.v1.books import BOOK_PAGE_COLUMNS
+from schemas import ReturnedBook
+from services.serialization import rows_as_dicts
+
+
+async def _validated(session, field, rows: int) -> tuple[float, float, bytes]:
+    started = time.perf_counter()
+    books = (await session.execute(select(Book).order_by(Book.id).limit(rows))).scalars().all()
+    fetched = time.perf_counter()
+    content = await serialize_response(field=field, response_content={"books": books, "next_cursor": None})
+    body = ORJSONResponse(content).body
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+async def _fast(session, field, rows: int) -> tuple[float, float, bytes]:
+    started = time.perf_counter()
+    books = (await session.execute(select(*BOOK_PAGE_COLUMNS).order_by(Book.id).limit(rows))).all()
+    fetched = time.perf_counter()
+    body = ORJSONResponse({"books": rows_as_dicts(books, ReturnedBook), "next_cursor": None}).body
+    return fetched - started, time.perf_counter() - fetched, body
+
+
+async def run(args: argparse.Namespace) -> None:
+    from main import app
+
+    await seed(args.sellers, args.rows)
+    global_init()
+    session_factory = get_session_factory()
+    route = next(route for route in app.routes if route.path == "/api/v1/books/" and "GET" in route.methods)
+
+    bodies = {}
+    print(f"{'mode':<12}{'fetch, ms':>12}{'serialize, ms':>16}{'total, ms':>12}{'size, KB':>10}")
+    for name, build in (("validated", _validated), ("fast", _fast)):
+        fetch, serialize = [], []
+        for i in range(args.warmup + args.repeat):
+            # Новая сессия на каждый ответ, как в ручке: ORM-объекты не переиспользуются из identity map
+            async with session_factory() as session:
+                fetch_time, serialize_time, bodies[name] = await build(session, route.response_field, args.rows)
+            if i >= args.warmup:
+                fetch.append(fetch_time * 1000)
+                serialize.append(serialize_time * 1000)
+        fetch_ms, serialize_ms = statistics.median(fetch), statistics.median(serialize)
+        print(
+            f"{name:<12}{fetch_ms:>12.2f}{serialize_ms:>16.2f}{fetch_ms + serialize_ms:>12.2f}"
+            f"{len(bodies[name]) / 1024:>10.1f}"
+        )
+
+    if bodies["validated"] != bodies["fast"]:
+        raise SystemExit("Responses differ: the fast path must produce the same bytes as validation")
+    await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
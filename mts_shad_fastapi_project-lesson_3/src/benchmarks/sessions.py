@@ -0,0 +1,114 @@
+"""Бенчмарк накладных расходов сессии БД на запрос.
+
+Считает, сколько обращений к БД делает одна ручка: SQL-запросы плюс служебные BEGIN, COMMIT и ROLLBACK,
+и сравнивает два режима сессии для ручек чтения:
+- transaction: ручки чтения получают ту же сессию, что и ручки записи (так было раньше),
+  каждый запрос оборачивается в BEGIN ... COMMIT;
+- autocommit: ручки чтения получают get_read_session, запросы выполняются без явной транзакции.
+
+BEGIN/COMMIT/ROLLBACK asyncpg отправляет сам, мимо событий SQLAlchemy, поэтому они считаются
+обертками над методами адаптера соединения asyncpg. Кэш чтения отключается, чтобы каждый запрос шел в БД.
+
+ВНИМАНИЕ: как и benchmarks.api, очищает таблицы книг и продавцов, поэтому работает только
+с отдельной базой из DB_BENCHMARK_NAME.
+
+Запуск из папки src:
+    python -m benchmarks.sessions --requests 1000 --concurrency 16
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql.asyncpg import AsyncAdapt_asyncpg_connection
+from sqlalchemy.engine import Engine
+
+from benchmarks.api import asgi_client, build_scenarios, drive, seed
+from configurations.database import get_async_session, get_read_session
+from services.cache import NullCache, get_cache
+
+DEFAULT_SCENARIOS = ["books.get", "books.list", "books.batch", "sellers.get", "sellers.stats", "books.patch"]
+
+
+# Считает обращения к БД: запросы через события SQLAlchemy, управление транзакцией - через адаптер asyncpg
+def _install_counters(counts: Counter) -> None:
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+
+    start_transaction = AsyncAdapt_asyncpg_connection._start_transaction
+    commit = AsyncAdapt_asyncpg_connection.commit
+    rollback = AsyncAdapt_asyncpg_connection.rollback
+
+    async def counting_start_transaction(self):
+        await start_transaction(self)
+        # В режиме autocommit адаптер транзакцию не начинает
+        if self._started:
+            counts["begin"] += 1
+
+    def counting_commit(self):
+        if self._started:
+            counts["commit"] += 1
+        commit(self)
+
+    def counting_rollback(self):
+        if self._started:
+            counts["rollback"] += 1
+        rollback(self)
+
+    AsyncAdapt_asyncpg_connection._start_transaction = counting_start_transaction
+    AsyncAdapt_asyncpg_connection.commit = counting_commit
+    AsyncAdapt_asyncpg_connection.rollback = counting_rollback
+
+
+async def run(args: argparse.Namespace) -> None:
+    from main import app
+
+    await seed(args.sellers, args.books)
+    scenarios = [s for s in build_scenarios(args.sellers, args.books, args.requests) if s.name in args.only]
+
+    counts: Counter = Counter()
+    _install_counters(counts)
+    null_cache = NullCache()
+    app.dependency_overrides[get_cache] = lambda: null_cache
+
+    print(
+        f"{'scenario':<16}{'mode':<13}{'db calls':>10}{'begin':>8}{'commit':>8}{'rollback':>10}"
+        f"{'rps':>10}{'p50, ms':>10}"
+    )
+    async with asgi_client(args) as client:
+        for scenario in scenarios:
+            for mode in ("transaction", "autocommit"):
+                if mode == "transaction":
+                    app.dependency_overrides[get_read_session] = get_async_session
+                else:
+                    app.dependency_overrides.pop(get_read_session, None)
+
+                await drive(client, scenario, args.warmup, args.concurrency)
+                counts.clear()
+                result = await drive(client, scenario, args.requests, args.concurrency)
+                per_request = {key: value / result["requests"] for key, value in counts.items()}
+                calls = sum(per_request.values())
+                print(
+                    f"{scenario.name:<16}{mode:<13}{calls:>10.2f}{per_request.get('begin', 0):>8.2f}"
+                    f"{per_request.get('commit', 0):>8.2f}{per_request.get('rollback', 0):>10.2f}"
+                    f"{result['rps']:>10.1f}{result['p50_ms']:>10.2f}"
+                )
+    app.dependency_overrides.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", nargs="+", default=DEFAULT_SCENARIOS)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Бенчмарк масштабирования по числу воркеров.
+
+Для каждого числа воркеров поднимает server.py, гоняет ручки чтения и печатает RPS,
+задержку и эффективность масштабирования (RPS / (RPS одного воркера * N)).
+
+Один процесс-клиент на Python сам упирается в ядро раньше сервера, поэтому нагрузку
+дают несколько процессов-клиентов (--clients). Клиентам и серверу нужны разные ядра:
+на машине с C ядрами имеет смысл проверять до C - clients воркеров.
+
+ВНИМАНИЕ: как и benchmarks.api, очищает таблицы книг и продавцов, поэтому работает только
+с отдельной базой из DB_BENCHMARK_NAME.
+
+Запуск из папки src:
+    python -m benchmarks.workers --workers 1 2 4 8 --clients 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.api import SRC_DIR, _wait_ready, build_scenarios, percentile, seed
+
+
+# Клиент в отдельном процессе: concurrency корутин гоняют сценарии по кругу, пока не выйдет время
+def _client(base_url: str, scenario_names: list[str], sellers: int, books: int, concurrency: int, seconds: float):
+    scenarios = [s for s in build_scenarios(sellers, books, 1) if s.name in scenario_names]
+
+    async def run() -> list[float]:
+        latencies: list[float] = []
+        deadline = time.perf_counter() + seconds
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+            async def worker(offset: int) -> None:
+                i = offset
+                while time.perf_counter() < deadline:
+                    scenario = scenarios[i % len(scenarios)]
+                    started = time.perf_counter()
+                    response = await client.get(scenario.path(i))
+                    await response.aread()
+                    if response.status_code == scenario.status:
+                        latencies.append(time.perf_counter() - started)
+                    i += concurrency
+
+            await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        return latencies
+
+    return asyncio.run(run())
+
+
+def _run_level(args: argparse.Namespace, workers: int) -> dict:
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "server.py",
+            "--host",
+            args.host,
+            "--port",
+            str(args.port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=SRC_DIR,
+    )
+    base_url = f"http://{args.host}:{args.port}"
+    try:
+        asyncio.run(_wait_ready_url(base_url, process))
+        with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+            started = time.perf_counter()
+            results = pool.starmap(
+                _client,
+                [
+                    (base_url, args.scenarios, args.sellers, args.books, args.concurrency, args.seconds)
+                    for _ in range(args.clients)
+                ],
+            )
+            elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    latencies_ms = [latency * 1000 for latencies in results for latency in latencies]
+    return {
+        "workers": workers,
+        "requests": len(latencies_ms),
+        "rps": len(latencies_ms) / elapsed,
+        "p50_ms": percentile(latencies_ms, 50),
+        "p99_ms": percentile(latencies_ms, 99),
+    }
+
+
+async def _wait_ready_url(base_url: str, process: subprocess.Popen) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        await _wait_ready(client, process)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)))
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных запросов на процесс-клиент")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--scenarios", nargs="+", default=["books.get", "books.list", "sellers.get"])
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.sellers, args.books))
+
+    print(f"{'workers':>8}{'rps':>10}{'p50, ms':>10}{'p99, ms':>10}{'scaling':>10}")
+    base_rps = None
+    for workers in args.workers:
+        result = _run_level(args, workers)
+        base_rps = base_rps or result["rps"] / workers
+        print(
+            f"{workers:>8}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['rps'] / (base_rps * workers):>10.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,125 @@
 import logging
-from typing import AsyncGenerator, Callable, Optional
+import os
+from typing import AsyncGenerator, Awaitable, Callable, Optional
 
+from fastapi import Request
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from models.base import BaseModel
 from models.books import Book  # noqa F401
 
+from .pool import InstrumentedQueuePool
+from .replicas import ReplicaSet, RoutingSession, primary_required
 from .settings import settings
 
-logger = logging.getLogger("__name__")
+logger = logging.getLogger(__name__)
 
 
-__all__ = ["global_init", "get_async_session", "create_db_and_tables", "delete_db_and_tables"]
+__all__ = [
+    "global_init",
+    "get_async_session",
+    "get_read_session",
+    "reads_from_replica",
+    "get_session_factory",
+    "get_pool_stats",
+    "get_replica_stats",
+    "start_replica_health_checks",
+    "on_commit",
+    "run_after_commit",
+    "dispose_engine",
+    "ping_database",
+    "create_db_and_tables",
+    "delete_db_and_tables",
+]
 
 __async_engine: Optional[AsyncEngine] = None
 __session_factory: Optional[Callable[[], AsyncSession]] = None
+__read_session_factory: Optional[Callable[..., AsyncSession]] = None
+__replicas: Optional[ReplicaSet] = None
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
 
+def _create_engine(url: str, **kwargs) -> AsyncEngine:
+    engine = create_async_engine(
+        url=url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.max_connection_count,
+        max_overflow=settings.db_pool_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # Кэш подготовленных выражений на стороне SQLAlchemy и самого asyncpg
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            "statement_cache_size": settings.db_statement_cache_size,
+        },
+        **kwargs,
+    )
+    # Время и число SQL-запросов для метрик (/metrics) и лог медленных запросов.
+    # Импорт здесь, так как services.metrics сам импортирует настройки из этого пакета.
+    from services.metrics import instrument_engine
+
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
 def global_init() -> None:
-    global __async_engine, __session_factory
+    global __async_engine, __session_factory, __read_session_factory, __replicas
 
     if __session_factory:
-        print("if __session_factory:")
         return
-        
+
     if not __async_engine:
-        print("if not __async_engine:")
-        __async_engine = create_async_engine(url=SQLALCHEMY_DATABASE_URL, echo=False)  # TODO
+        __async_engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+
+    # Реплики только читают, поэтому их соединения сразу работают в режиме AUTOCOMMIT
+    if settings.db_replica_urls and __replicas is None:
+        __replicas = ReplicaSet(
+            [_create_engine(url, isolation_level="AUTOCOMMIT") for url in settings.db_replica_urls],
+            check_interval=settings.db_replica_check_interval,
+            check_timeout=settings.health_check_timeout,
+        )
 
     __session_factory = async_sessionmaker(__async_engine)
-    print(type(__session_factory))
+    # Сессии только для чтения работают в режиме AUTOCOMMIT: без BEGIN и COMMIT вокруг запросов.
+    # Движок с другими execution_options использует тот же пул соединений.
+    # RoutingSession отправляет чтение на реплику, выбранную в get_read_session, а без нее - в основную БД.
+    __read_session_factory = async_sessionmaker(
+        __async_engine.execution_options(isolation_level="AUTOCOMMIT"),
+        autoflush=False,
+        sync_session_class=RoutingSession,
+    )
+    logger.info("Database engine initialized", extra={"pool_size": settings.max_connection_count})
+
+
+# Соединения пула нельзя делить между процессами: два процесса, пишущие в один сокет, портят протокол.
+# Если процесс форкается после global_init (например, gunicorn с preload), в дочернем процессе
+# забываем движок родителя, не закрывая его соединения (dispose(close=False)),
+# и следующий global_init создаст собственный движок воркера.
+def _reset_engine_after_fork() -> None:
+    global __async_engine, __session_factory, __read_session_factory, __replicas
+
+    if __async_engine is not None:
+        __async_engine.sync_engine.dispose(close=False)
+    if __replicas is not None:
+        for engine in __replicas.engines:
+            engine.sync_engine.dispose(close=False)
+    __async_engine = None
+    __session_factory = None
+    __read_session_factory = None
+    __replicas = None
 
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engine_after_fork)
+
+
+# Сессия для ручек, которые меняют данные. Коммит один раз в конце запроса, после него - действия after_commit.
+# При ошибке транзакцию откатывает close(): он возвращает соединение в пул, а пул делает ROLLBACK,
+# если транзакция не завершена. После успешного коммита откатывать нечего, лишний запрос не отправляется.
 async def get_async_session() -> AsyncGenerator:
     global __session_factory
 
@@ -48,10 +135,113 @@ async def get_async_session() -> AsyncGenerator:
         logger.error("Raises exception: %s", e)
         raise e
     finally:
-        await session.rollback()
         await session.close()
+    await run_after_commit(session)
+
+
+# Сессия для ручек, которые только читают. Каждый запрос выполняется в своей неявной транзакции,
+# поэтому BEGIN и COMMIT не нужны. Соединение берется из пула при первом запросе,
+# так что ответ из кэша не занимает соединение вовсе.
+# Если настроены реплики, чтение идет на следующую живую реплику. Исключение - клиент, который
+# недавно писал (см. ReadYourWritesMiddleware): его чтения идут в основную БД, чтобы он увидел свои изменения.
+async def get_read_session(request: Request) -> AsyncGenerator:
+    global __read_session_factory, __replicas
+
+    if not __read_session_factory:
+        raise ValueError({"message": "You must call global_init() before using this method."})
+
+    replica = None
+    if __replicas is not None and not primary_required(request.cookies):
+        replica = __replicas.pick()
+    session: AsyncSession = __read_session_factory(info={"replica": replica})
+
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+# Читает ли сессия с реплики. Реплика может отставать от основной БД, поэтому прочитанное с нее
+# не кладем в кэш: иначе запись, только что сброшенная из кэша после коммита, вернется туда
+# в старом виде и будет отдаваться до истечения cache_ttl.
+def reads_from_replica(session: AsyncSession) -> bool:
+    return session.info.get("replica") is not None
+
+
+# Регистрирует действие, которое нужно выполнить только после успешного коммита сессии.
+# Например, сброс кэша: если сделать его до коммита, параллельный запрос успеет положить в кэш старые данные.
+def on_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session: AsyncSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        await callback()
+
+
+# Фабрика сессий для случаев, когда сессия должна жить дольше зависимости,
+# например при потоковой отдаче ответа (StreamingResponse).
+def get_session_factory() -> Callable[[], AsyncSession]:
+    global __session_factory
+
+    if not __session_factory:
+        raise ValueError({"message": "You must call global_init() before using this method."})
+
+    return __session_factory
+
+
+# Текущее состояние пула соединений: занятые, свободные, overflow и время ожидания соединения
+def get_pool_stats() -> dict:
+    global __async_engine
+
+    if __async_engine is None:
+        raise ValueError({"message": "You must call global_init() before using this method."})
+
+    return __async_engine.pool.stats()
+
+
+# Состояние реплик для чтения: адрес (без пароля) и выведена ли реплика из ротации
+def get_replica_stats() -> list[dict]:
+    global __replicas
+
+    return __replicas.stats() if __replicas is not None else []
+
+
+# Проверяет реплики перед приемом трафика и запускает их фоновую проверку. Без реплик ничего не делает.
+async def start_replica_health_checks() -> None:
+    global __replicas
+
+    if __replicas is not None:
+        await __replicas.start()
+
+
+# Закрывает все соединения пула при остановке приложения
+async def dispose_engine() -> None:
+    global __async_engine, __session_factory, __read_session_factory, __replicas
+
+    if __async_engine is not None:
+        await __async_engine.dispose()
+    if __replicas is not None:
+        await __replicas.dispose()
+    __async_engine = None
+    __session_factory = None
+    __read_session_factory = None
+    __replicas = None
+
+
+# Проверка доступности БД для readiness-пробы
+async def ping_database() -> None:
+    global __async_engine
+
+    if __async_engine is None:
+        raise ValueError({"message": "You must call global_init() before using this method."})
+
+    async with __async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
 
 
+# Схему БД создают миграции (alembic upgrade head). create_db_and_tables и delete_db_and_tables
+# оставлены для тестов и бенчмарков, приложение их не вызывает.
 async def create_db_and_tables():
     global __async_engine
 
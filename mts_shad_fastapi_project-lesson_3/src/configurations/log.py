@@ -0,0 +1,103 @@
+"""
+Настройка логирования приложения.
+
+Логи пишутся в stdout строками JSON (удобно собирать в ELK, Loki и т.п.).
+Запись в поток не блокирует event loop: обработчики кладут записи в очередь (QueueHandler),
+а форматирование и вывод выполняет отдельный поток (QueueListener).
+К каждой записи добавляется id запроса, в рамках которого она сделана (см. RequestIdMiddleware).
+"""
+
+import copy
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+
+from services.request_context import get_request_id
+
+__all__ = ["JsonFormatter", "RequestIdFilter", "setup_logging", "stop_logging"]
+
+# Стандартные атрибуты LogRecord. Все остальное пришло через extra и попадает в JSON отдельными полями.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+__listener: Optional[QueueListener] = None
+
+
+# Id запроса нужно взять в том потоке, где сделана запись: в потоке QueueListener contextvar уже другой
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return orjson.dumps(data, default=str).decode()
+
+
+# Стандартный QueueHandler.prepare форматирует запись целиком в потоке вызова.
+# Мы в потоке вызова только подставляем аргументы в сообщение (они могут измениться, пока запись в очереди)
+# и превращаем трейсбек в текст (он держит ссылки на кадры стека), а JSON собираем уже в потоке слушателя.
+class _RecordQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: str = "INFO", json: bool = True) -> None:
+    global __listener
+
+    if __listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        )
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _RecordQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    # SQLAlchemy пишет служебные сообщения пула на уровне INFO. Пул приложения - наследник пула SQLAlchemy,
+    # поэтому его логгер называется по нашему модулю. SQL-запросы включаются отдельно настройкой db_echo.
+    for name in ("sqlalchemy", "configurations.pool"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+    __listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    __listener.start()
+
+
+# Дописывает оставшиеся в очереди записи и останавливает поток вывода
+def stop_logging() -> None:
+    global __listener
+
+    if __listener is not None:
+        __listener.stop()
+        __listener = None
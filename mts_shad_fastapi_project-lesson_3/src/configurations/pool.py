@@ -0,0 +1,51 @@
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+__all__ = ["InstrumentedQueuePool", "PoolWaitStats"]
+
+
+# Статистика ожидания свободного соединения в пуле
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    timeouts: int = 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["avg_wait"] = self.total_wait / self.checkouts if self.checkouts else 0.0
+        return data
+
+
+# Стандартный асинхронный пул SQLAlchemy, который дополнительно считает,
+# сколько времени запросы ждут выдачи соединения.
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_stats.checkouts += 1
+            self.wait_stats.total_wait += waited
+            self.wait_stats.max_wait = max(self.wait_stats.max_wait, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "wait": self.wait_stats.as_dict(),
+        }
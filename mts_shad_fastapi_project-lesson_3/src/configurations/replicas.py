@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+__all__ = ["READ_YOUR_WRITES_COOKIE", "ReplicaSet", "RoutingSession", "primary_required"]
+
+logger = logging.getLogger(__name__)
+
+# Cookie, в которой клиенту после записи выдается момент (unix time), до которого его чтения идут в основную БД
+READ_YOUR_WRITES_COOKIE = "read_primary_until"
+
+
+# Реплики для чтения. Запросы распределяются по кругу между живыми репликами.
+# Реплика выводится из ротации, если не отвечает на проверку или на ней рвется соединение,
+# и возвращается, когда снова ответит на проверку. Если живых реплик нет, чтение идет в основную БД.
+class ReplicaSet:
+    def __init__(self, engines: list[AsyncEngine], check_interval: float, check_timeout: float):
+        self.engines = engines
+        self._check_interval = check_interval
+        self._check_timeout = check_timeout
+        self._healthy = {engine.sync_engine: True for engine in engines}
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        for engine in engines:
+            event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    # Следующая живая реплика или None, если читать нужно из основной БД
+    def pick(self) -> Optional[Engine]:
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._counter) % len(self.engines)].sync_engine
+            if self._healthy[engine]:
+                return engine
+        return None
+
+    def _set_healthy(self, engine: Engine, healthy: bool) -> None:
+        if self._healthy[engine] != healthy:
+            logger.warning("Replica %s is %s", engine.url.render_as_string(), "up" if healthy else "down")
+        self._healthy[engine] = healthy
+
+    # Ошибка соединения посреди запроса выводит реплику из ротации сразу, не дожидаясь следующей проверки.
+    # Ошибки самого запроса (например, нарушение ограничения) на здоровье реплики не влияют.
+    def _handle_error(self, context) -> None:
+        if context.is_disconnect or context.connection is None:
+            self._set_healthy(context.engine, False)
+
+    async def _check_one(self, engine: AsyncEngine) -> None:
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self._check_timeout)
+        except Exception as e:
+            logger.debug("Replica check failed: %r", e)
+            self._set_healthy(engine.sync_engine, False)
+        else:
+            self._set_healthy(engine.sync_engine, True)
+
+    # Проверяет все реплики одновременно
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check_one(engine) for engine in self.engines))
+
+    async def _check_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._check_interval)
+            await self.check()
+
+    # Первая проверка - до приема трафика, дальше - в фоне раз в check_interval секунд
+    async def start(self) -> None:
+        await self.check()
+        self._task = asyncio.create_task(self._check_forever())
+
+    def stats(self) -> list[dict]:
+        return [
+            {"url": engine.url.render_as_string(), "healthy": self._healthy[engine.sync_engine]}
+            for engine in self.engines
+        ]
+
+    async def dispose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+
+# Сессия, которая читает из выбранной для нее реплики (session.info["replica"]), а пишет в основную БД.
+# Сессии чтения пишут только по ошибке, но и тогда запись не уйдет на реплику, которая ее не примет.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or isinstance(clause, UpdateBase):
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        return replica
+
+
+# Клиент недавно писал: реплика могла еще не получить его изменения, поэтому читаем из основной БД
+def primary_required(cookies: dict[str, str]) -> bool:
+    try:
+        return float(cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
@@ -3,18 +3,31 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
-from configurations.database import create_db_and_tables, delete_db_and_tables, global_init
-from routers import v1_router
+from configurations.database import dispose_engine, global_init, start_replica_health_checks
+from configurations.log import setup_logging, stop_logging
+from configurations.settings import settings
+from routers import health_router, internal_router, metrics_router, v1_router
+from services.metrics import MetricsMiddleware
+from services.passwords import shutdown_password_hasher
+from services.read_your_writes import ReadYourWritesMiddleware
+from services.request_context import RequestIdMiddleware
+from services.sql_profiling import ProfilingMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # Рекомендуется теперь вместо @app.on_event()
-    # Запускается при старте приложения
+    # Запускается при старте приложения.
+    # Схему БД приложение не трогает: ее создают и меняют миграции (alembic upgrade head) отдельным шагом.
+    # Старт воркера - только создание движка, соединения открываются лениво при первом запросе.
+    setup_logging(settings.log_level, settings.log_json)
     global_init()
-    await create_db_and_tables()
+    # Реплики для чтения (если настроены) проверяются до приема трафика и дальше в фоне
+    await start_replica_health_checks()
     yield
-    # Запускается при остановке приложения
-    await delete_db_and_tables()
+    # Запускается при остановке приложения. Данные не удаляем, только закрываем соединения.
+    await dispose_engine()
+    shutdown_password_hasher()
+    stop_logging()
 
 
 # Само приложение fastApi. именно оно запускается сервером и служит точкой входа
@@ -35,6 +48,14 @@ app = create_application()
 
 def _configure():
     app.include_router(v1_router)
+    app.include_router(internal_router)
+    app.include_router(metrics_router)
+    app.include_router(health_router)
+    # Последний добавленный middleware - внешний. ProfilingMiddleware должен быть внутри MetricsMiddleware.
+    app.add_middleware(ProfilingMiddleware)  # Server-Timing по заголовку X-Profile-SQL
+    app.add_middleware(ReadYourWritesMiddleware)  # после записи клиент читает из основной БД, а не с реплики
+    app.add_middleware(MetricsMiddleware)  # время ответа, коды и SQL-запросы по ручкам
+    app.add_middleware(RequestIdMiddleware)  # X-Request-ID для логов
 
 
 # @app.on_event("startup")  # Вместо этого теперь рекомендуется lifespan
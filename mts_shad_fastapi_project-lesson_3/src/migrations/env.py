@@ -0,0 +1,64 @@
+"""
+Окружение миграций Alembic.
+
+Миграции - отдельный шаг развертывания, приложение само схему БД не трогает:
+    alembic upgrade head        # из корня проекта, или make migrate
+
+Адрес БД берется из настроек приложения (DB_HOST, DB_NAME в .env),
+если он не задан явно через sqlalchemy.url (так делают тесты).
+"""
+
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from configurations.settings import settings
+from models import books, seller_stats, sellers  # noqa F401 - регистрируем таблицы в метаданных
+from models.base import BaseModel
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = BaseModel.metadata
+database_url = config.get_main_option("sqlalchemy.url") or settings.database_url
+
+
+# Генерация SQL без подключения к БД: alembic upgrade head --sql
+def run_migrations_offline() -> None:
+    context.configure(
+        url=database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata, compare_server_default=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    engine = create_async_engine(database_url, poolclass=pool.NullPool)
+
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,85 @@
+"""initial schema
+
+Схема на момент перехода на миграции: продавцы, книги и индексы для поиска.
+Ревизия повторяет схему, которую создавал create_all последней версии приложения до миграций
+(с колонками version и индексами поиска). Только такие БД можно пометить alembic stamp 0001
+и дальше обновлять через alembic upgrade head. В БД, созданных более ранними версиями, нет
+колонок version или индексов поиска: stamp для них оставит схему неполной, их нужно пересоздать
+через alembic upgrade head и перенести данные.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 05:01:44.389936
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Триграммные индексы требуют расширения pg_trgm
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        "sellers_table",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("first_name", sa.String(length=50), nullable=False),
+        sa.Column("last_name", sa.String(length=100), nullable=False),
+        sa.Column("email", sa.String(length=50), nullable=False),
+        sa.Column("password", sa.String(length=255), nullable=False),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "books_table",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(length=50), nullable=False),
+        sa.Column("author", sa.String(length=100), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("count_pages", sa.Integer(), nullable=False),
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers_table.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_books_table_seller_id_year", "books_table", ["seller_id", "year"])
+    op.create_index("ix_books_table_year", "books_table", ["year"])
+    op.create_index(
+        "ix_books_table_title_trgm",
+        "books_table",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_books_table_author_trgm",
+        "books_table",
+        ["author"],
+        postgresql_using="gin",
+        postgresql_ops={"author": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_books_table_search_vector",
+        "books_table",
+        [sa.text("to_tsvector('simple'::regconfig, (title || ' ') || author)")],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_table_search_vector", table_name="books_table")
+    op.drop_index("ix_books_table_author_trgm", table_name="books_table")
+    op.drop_index("ix_books_table_title_trgm", table_name="books_table")
+    op.drop_index("ix_books_table_year", table_name="books_table")
+    op.drop_index("ix_books_table_seller_id_year", table_name="books_table")
+    op.drop_table("books_table")
+    op.drop_table("sellers_table")
@@ -0,0 +1,33 @@
+"""books seller cascade
+
+Книги удаляются вместе с продавцом на стороне БД: внешний ключ books_table.seller_id
+пересоздается с ON DELETE CASCADE.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:12:05.114371
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Имя, которое Postgres дал ограничению в ревизии 0001
+FOREIGN_KEY = "books_table_seller_id_fkey"
+
+
+def upgrade() -> None:
+    op.drop_constraint(FOREIGN_KEY, "books_table", type_="foreignkey")
+    op.create_foreign_key(FOREIGN_KEY, "books_table", "sellers_table", ["seller_id"], ["id"], ondelete="CASCADE")
+
+
+def downgrade() -> None:
+    op.drop_constraint(FOREIGN_KEY, "books_table", type_="foreignkey")
+    op.create_foreign_key(FOREIGN_KEY, "books_table", "sellers_table", ["seller_id"], ["id"])
@@ -0,0 +1,148 @@
+"""seller stats
+
+Сводная таблица по книгам продавцов (количество, сумма страниц, диапазон лет) и триггеры
+на books_table, которые поддерживают ее при вставке, изменении и удалении книг.
+Таблица заполняется по существующим книгам. На время заполнения books_table блокируется
+от записи, чтобы изменения между заполнением и включением триггеров не потерялись.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:37:48.502117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPGRADE_DDL = [
+    """
+CREATE OR REPLACE FUNCTION seller_stats_apply_books_change() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    touched integer[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO seller_stats_table AS s (seller_id, books_count, total_pages, min_year, max_year)
+        SELECT seller_id, count(*), sum(count_pages), min(year), max(year)
+        FROM new_rows GROUP BY seller_id ORDER BY seller_id
+        ON CONFLICT (seller_id) DO UPDATE SET
+            books_count = s.books_count + excluded.books_count,
+            total_pages = s.total_pages + excluded.total_pages,
+            min_year = least(s.min_year, excluded.min_year),
+            max_year = greatest(s.max_year, excluded.max_year);
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        UPDATE seller_stats_table AS s
+        SET books_count = s.books_count - d.books_count, total_pages = s.total_pages - d.total_pages
+        FROM (
+            SELECT seller_id, count(*) AS books_count, sum(count_pages) AS total_pages
+            FROM old_rows GROUP BY seller_id
+        ) AS d
+        WHERE s.seller_id = d.seller_id;
+        touched := ARRAY(SELECT DISTINCT seller_id FROM old_rows);
+    ELSE
+        -- Изменения названия, автора и версии на сводку не влияют, такие строки пропускаем
+        WITH changed AS (
+            SELECT o.seller_id AS old_seller_id, o.count_pages AS old_pages,
+                   n.seller_id AS new_seller_id, n.count_pages AS new_pages
+            FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.seller_id, o.count_pages, o.year) IS DISTINCT FROM (n.seller_id, n.count_pages, n.year)
+        ), deltas AS (
+            SELECT old_seller_id AS seller_id, -1 AS books_count, -old_pages AS total_pages FROM changed
+            UNION ALL
+            SELECT new_seller_id, 1, new_pages FROM changed
+        ), upserted AS (
+            INSERT INTO seller_stats_table AS s (seller_id, books_count, total_pages)
+            SELECT seller_id, sum(books_count), sum(total_pages) FROM deltas GROUP BY seller_id ORDER BY seller_id
+            ON CONFLICT (seller_id) DO UPDATE SET
+                books_count = s.books_count + excluded.books_count,
+                total_pages = s.total_pages + excluded.total_pages
+            RETURNING s.seller_id
+        )
+        SELECT array_agg(seller_id) INTO touched FROM upserted;
+        IF touched IS NULL THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    UPDATE seller_stats_table AS s
+    SET min_year = (SELECT min(year) FROM books_table AS b WHERE b.seller_id = s.seller_id),
+        max_year = (SELECT max(year) FROM books_table AS b WHERE b.seller_id = s.seller_id)
+    WHERE s.seller_id = ANY(touched);
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE OR REPLACE FUNCTION seller_stats_reset() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM seller_stats_table;
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE TRIGGER seller_stats_after_insert AFTER INSERT ON books_table
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_update AFTER UPDATE ON books_table
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_delete AFTER DELETE ON books_table
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_truncate AFTER TRUNCATE ON books_table
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_reset()
+""",
+]
+
+BACKFILL = """
+INSERT INTO seller_stats_table (seller_id, books_count, total_pages, min_year, max_year)
+SELECT seller_id, count(*), sum(count_pages), min(year), max(year)
+FROM books_table GROUP BY seller_id
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "seller_stats_table",
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("books_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("total_pages", sa.BigInteger(), server_default="0", nullable=False),
+        sa.Column("min_year", sa.Integer(), nullable=True),
+        sa.Column("max_year", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers_table.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("seller_id"),
+    )
+    op.create_index("ix_seller_stats_table_books_count", "seller_stats_table", ["books_count", "seller_id"])
+    op.create_index("ix_seller_stats_table_total_pages", "seller_stats_table", ["total_pages", "seller_id"])
+
+    op.execute("LOCK TABLE books_table IN SHARE ROW EXCLUSIVE MODE")
+    for statement in UPGRADE_DDL:
+        op.execute(statement)
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    for trigger in ("insert", "update", "delete", "truncate"):
+        op.execute(f"DROP TRIGGER seller_stats_after_{trigger} ON books_table")
+    op.execute("DROP FUNCTION seller_stats_apply_books_change()")
+    op.execute("DROP FUNCTION seller_stats_reset()")
+    op.drop_index("ix_seller_stats_table_total_pages", table_name="seller_stats_table")
+    op.drop_index("ix_seller_stats_table_books_count", table_name="seller_stats_table")
+    op.drop_table("seller_stats_table")
@@ -0,0 +1,35 @@
+"""books keyset indexes
+
+Индексы поиска по годам и по продавцу с годами дополняются колонкой id. Страницы поиска
+идут по ИД (ORDER BY id LIMIT), и при фильтре по одному году индекс отдает строки сразу
+в порядке страницы, а не через просмотр первичного ключа с фильтром.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:05:31.642907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_books_table_seller_id_year_id", "books_table", ["seller_id", "year", "id"])
+    op.create_index("ix_books_table_year_id", "books_table", ["year", "id"])
+    op.drop_index("ix_books_table_year", table_name="books_table")
+    op.drop_index("ix_books_table_seller_id_year", table_name="books_table")
+
+
+def downgrade() -> None:
+    op.create_index("ix_books_table_seller_id_year", "books_table", ["seller_id", "year"])
+    op.create_index("ix_books_table_year", "books_table", ["year"])
+    op.drop_index("ix_books_table_year_id", table_name="books_table")
+    op.drop_index("ix_books_table_seller_id_year_id", table_name="books_table")
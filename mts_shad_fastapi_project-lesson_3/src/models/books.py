@@ -1,17 +1,49 @@
-from sqlalchemy import Table, Column, Integer, String, ForeignKey
+from sqlalchemy import DDL, ForeignKey, Index, String, column, event, func, literal_column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
 
+
+# Документ для полнотекстового поиска по книге. Индекс и запрос должны использовать
+# одно и то же выражение, иначе Postgres не применит индекс.
+def search_vector(title, author):
+    document = title.op("||")(literal_column("' '")).op("||")(author)
+    return func.to_tsvector(literal_column("'simple'::regconfig"), document)
+
+
+def search_query(text: str):
+    return func.plainto_tsquery(literal_column("'simple'::regconfig"), text)
+
+
 class Book(BaseModel):
     __tablename__ = "books_table"
+    # Индексы для поиска книг (см. services.search). Страницы поиска идут по ИД (ORDER BY id LIMIT),
+    # поэтому id замыкает btree-индексы: при равенстве по ведущим колонкам индекс сразу отдает строки
+    # в порядке страницы, без сортировки и без просмотра первичного ключа с фильтром.
+    __table_args__ = (
+        Index("ix_books_table_seller_id_year_id", "seller_id", "year", "id"),  # внешний ключ + фильтр продавца по годам
+        Index("ix_books_table_year_id", "year", "id"),
+        Index("ix_books_table_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_books_table_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+        Index("ix_books_table_search_vector", search_vector(column("title"), column("author")), postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     title: Mapped[str] = mapped_column(String(50), nullable=False)
     author: Mapped[str] = mapped_column(String(100), nullable=False)
     year: Mapped[int]
     count_pages: Mapped[int]
-    seller_id: Mapped[int] = mapped_column(ForeignKey("sellers_table.id"), nullable=False)
-    seller = relationship("Seller", back_populates = "books", lazy = 'selectin')
+    # Книги удаляются вместе с продавцом на стороне БД (см. Seller.books)
+    seller_id: Mapped[int] = mapped_column(ForeignKey("sellers_table.id", ondelete="CASCADE"), nullable=False)
+    # Номер версии записи, увеличивается при каждом изменении. Из него строится ETag.
+    # ORM сама увеличивает версию при flush и добавляет ее в WHERE у UPDATE и DELETE:
+    # если запись успели изменить, запрос не найдет строку и flush упадет со StaleDataError.
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+    # Связь не загружается автоматически. Каждая ручка сама решает, какие данные ей нужны,
+    # а случайная ленивая загрузка в асинхронном коде падает с ошибкой, а не делает скрытый запрос.
+    seller = relationship("Seller", back_populates="books", lazy="raise_on_sql")
 
 
+# Триграммные индексы требуют расширения pg_trgm
+event.listen(Book.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
@@ -0,0 +1,128 @@
+from typing import Optional
+
+from sqlalchemy import DDL, BigInteger, ForeignKey, Index, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+from .books import Book
+
+
+# Сводка по книгам продавца. Не считается на лету, а поддерживается триггерами на books_table
+# (см. SELLER_STATS_DDL), поэтому чтение статистики не зависит от количества книг.
+class SellerStats(BaseModel):
+    __tablename__ = "seller_stats_table"
+    # Индексы для рейтинга продавцов: обратный проход по индексу дает порядок "больше - выше"
+    __table_args__ = (
+        Index("ix_seller_stats_table_books_count", "books_count", "seller_id"),
+        Index("ix_seller_stats_table_total_pages", "total_pages", "seller_id"),
+    )
+
+    seller_id: Mapped[int] = mapped_column(ForeignKey("sellers_table.id", ondelete="CASCADE"), primary_key=True)
+    books_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    total_pages: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+    # NULL, если у продавца нет книг
+    min_year: Mapped[Optional[int]]
+    max_year: Mapped[Optional[int]]
+
+
+# Триггеры уровня запроса (FOR EACH STATEMENT) с таблицами переходов: массовая вставка или удаление
+# обновляет сводку одним запросом на всю пачку, а не по запросу на каждую книгу.
+# Количество и сумма страниц меняются на разницу. Минимальный год при вставке берется через least/greatest,
+# а при удалении и изменении пересчитывается для затронутых продавцов по индексу (seller_id, year).
+# Таблицы переходов нельзя объявить у триггера на несколько событий, поэтому триггеров три, а функция одна.
+# Та же логика в миграции 0003, здесь она нужна для схемы, создаваемой через create_all (тесты, бенчмарки).
+# Копия в 0003 заморожена: изменение здесь требует новой миграции с тем же текстом.
+# test_migrations сверяет триггеры после миграций с триггерами из create_all.
+SELLER_STATS_DDL = [
+    """
+CREATE OR REPLACE FUNCTION seller_stats_apply_books_change() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    touched integer[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO seller_stats_table AS s (seller_id, books_count, total_pages, min_year, max_year)
+        SELECT seller_id, count(*), sum(count_pages), min(year), max(year)
+        FROM new_rows GROUP BY seller_id ORDER BY seller_id
+        ON CONFLICT (seller_id) DO UPDATE SET
+            books_count = s.books_count + excluded.books_count,
+            total_pages = s.total_pages + excluded.total_pages,
+            min_year = least(s.min_year, excluded.min_year),
+            max_year = greatest(s.max_year, excluded.max_year);
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        UPDATE seller_stats_table AS s
+        SET books_count = s.books_count - d.books_count, total_pages = s.total_pages - d.total_pages
+        FROM (
+            SELECT seller_id, count(*) AS books_count, sum(count_pages) AS total_pages
+            FROM old_rows GROUP BY seller_id
+        ) AS d
+        WHERE s.seller_id = d.seller_id;
+        touched := ARRAY(SELECT DISTINCT seller_id FROM old_rows);
+    ELSE
+        -- Изменения названия, автора и версии на сводку не влияют, такие строки пропускаем
+        WITH changed AS (
+            SELECT o.seller_id AS old_seller_id, o.count_pages AS old_pages,
+                   n.seller_id AS new_seller_id, n.count_pages AS new_pages
+            FROM old_rows AS o JOIN new_rows AS n USING (id)
+            WHERE (o.seller_id, o.count_pages, o.year) IS DISTINCT FROM (n.seller_id, n.count_pages, n.year)
+        ), deltas AS (
+            SELECT old_seller_id AS seller_id, -1 AS books_count, -old_pages AS total_pages FROM changed
+            UNION ALL
+            SELECT new_seller_id, 1, new_pages FROM changed
+        ), upserted AS (
+            INSERT INTO seller_stats_table AS s (seller_id, books_count, total_pages)
+            SELECT seller_id, sum(books_count), sum(total_pages) FROM deltas GROUP BY seller_id ORDER BY seller_id
+            ON CONFLICT (seller_id) DO UPDATE SET
+                books_count = s.books_count + excluded.books_count,
+                total_pages = s.total_pages + excluded.total_pages
+            RETURNING s.seller_id
+        )
+        SELECT array_agg(seller_id) INTO touched FROM upserted;
+        IF touched IS NULL THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    UPDATE seller_stats_table AS s
+    SET min_year = (SELECT min(year) FROM books_table AS b WHERE b.seller_id = s.seller_id),
+        max_year = (SELECT max(year) FROM books_table AS b WHERE b.seller_id = s.seller_id)
+    WHERE s.seller_id = ANY(touched);
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE OR REPLACE FUNCTION seller_stats_reset() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM seller_stats_table;
+    RETURN NULL;
+END
+$$
+""",
+    """
+CREATE TRIGGER seller_stats_after_insert AFTER INSERT ON books_table
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_update AFTER UPDATE ON books_table
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_delete AFTER DELETE ON books_table
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_apply_books_change()
+""",
+    """
+CREATE TRIGGER seller_stats_after_truncate AFTER TRUNCATE ON books_table
+FOR EACH STATEMENT EXECUTE FUNCTION seller_stats_reset()
+""",
+]
+
+# Триггеры висят на books_table, поэтому создаются вместе с ней. Функции ссылаются на seller_stats_table
+# только при выполнении, так что порядок создания таблиц не важен.
+for statement in SELLER_STATS_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement))
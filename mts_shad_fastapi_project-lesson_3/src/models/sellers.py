@@ -11,6 +11,14 @@ class Seller(BaseModel):
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(50), nullable=False)
-    password: Mapped[str] = mapped_column(String(20), nullable=False)
-    books = relationship("Book", back_populates = "seller", lazy = 'selectin')
+    # Храним не сам пароль, а его хеш (см. services.passwords)
+    password: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Номер версии записи, увеличивается при каждом изменении. Из него строится ETag.
+    # ORM сама увеличивает версию при flush и добавляет ее в WHERE у UPDATE и DELETE:
+    # если запись успели изменить, запрос не найдет строку и flush упадет со StaleDataError.
+    version: Mapped[int] = mapped_column(nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+    # Книги продавца не загружаются автоматически (см. Book.seller).
+    # passive_deletes - при удалении продавца не подгружаем его книги, это забота БД.
+    books = relationship("Book", back_populates="seller", lazy="raise_on_sql", passive_deletes=True)
 
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from .internal import health_router, internal_router, metrics_router
 from .v1.books import books_router
 from .v1.sellers import sellers_router
 
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, status
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+
+from configurations.database import get_pool_stats, get_replica_stats, ping_database
+from configurations.settings import settings
+from services.cache import get_cache
+from services.metrics import CONTENT_TYPE, collect_cache_stats, collect_pool_stats, registry
+
+# Служебные ручки для мониторинга. Не входят в публичное API v1.
+internal_router = APIRouter(tags=["internal"], prefix="/internal")
+
+# Метрики отдаются по общепринятому пути /metrics, без префикса
+metrics_router = APIRouter(tags=["internal"])
+
+# Пробы для балансировщика и оркестратора (Kubernetes liveness/readiness)
+health_router = APIRouter(tags=["health"], prefix="/health")
+
+logger = logging.getLogger(__name__)
+
+
+# Ручка, возвращающая состояние пула соединений с БД
+@internal_router.get("/pool")
+async def pool_stats():
+    return get_pool_stats()
+
+
+# Ручка, возвращающая состояние реплик для чтения: какие из них сейчас в ротации
+@internal_router.get("/replicas")
+async def replica_stats():
+    return get_replica_stats()
+
+
+# Ручка, возвращающая счетчики кэша: попадания, промахи, вытеснения
+@internal_router.get("/cache")
+async def cache_stats():
+    return get_cache().stats()
+
+
+# Ручка с метриками в формате Prometheus: задержки и коды ответов по ручкам, SQL-запросы, пул, кэш
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    collect_pool_stats(get_pool_stats())
+    collect_cache_stats(get_cache().stats())
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+# Процесс жив и обрабатывает запросы. БД не проверяем: ее недоступность - не повод перезапускать воркер.
+@health_router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+# Воркер готов принимать трафик: БД отвечает. Иначе 503, и балансировщик выводит воркер из ротации.
+@health_router.get("/ready")
+async def ready():
+    try:
+        await asyncio.wait_for(ping_database(), timeout=settings.health_check_timeout)
+    except Exception as e:
+        logger.warning("Readiness check failed: %r", e)
+        return ORJSONResponse({"status": "unavailable"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "ok"}
@@ -1,24 +1,69 @@
-from typing import Annotated
+import logging
+from collections import defaultdict
+from typing import Annotated, Any, Callable, Literal
 
-from fastapi import APIRouter, Depends, Response, status
-from icecream import ic
-from sqlalchemy import select
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import any_, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from configurations.database import get_async_session
+from configurations.database import get_async_session, get_read_session, get_session_factory, reads_from_replica
+from configurations.settings import settings
 from models.books import Book
-from schemas import IncomingBook, ReturnedAllBooks, ReturnedBook
+from models.sellers import Seller
+from schemas import (
+    DeletedBooks,
+    IncomingBook,
+    PatchBook,
+    ReturnedAllBooks,
+    ReturnedBatchBooks,
+    ReturnedBook,
+    ReturnedCreatedBooks,
+)
+from services.cache import CacheBackend, book_key, get_cache, invalidate_on_commit, seller_key
+from services.etag import (
+    IfMatch,
+    IfNoneMatch,
+    conflict,
+    etag_matches,
+    if_match_versions,
+    make_etag,
+    not_modified,
+    rows_fingerprint,
+)
+from services.export import EXPORT_FORMATS, stream_books
+from services.loaders import RequestLoaders
+from services.search import BookFilters, build_search_query
+from services.serialization import rows_as_dicts, schema_columns
+
+from .pagination import Pagination, keyset_query, page_etag, page_fingerprint_query, split_page
 
 books_router = APIRouter(tags=["books"], prefix="/books")
+logger = logging.getLogger(__name__)
 
 # Больше не симулируем хранилище данных. Подключаемся к реальному, через сессию.
 DBSession = Annotated[AsyncSession, Depends(get_async_session)]
+# Сессия без транзакции для ручек, которые только читают
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+SessionFactory = Annotated[Callable[[], AsyncSession], Depends(get_session_factory)]
+Cache = Annotated[CacheBackend, Depends(get_cache)]
+
+# Колонки, из которых собирается ReturnedBook
+RETURNED_BOOK_COLUMNS = (Book.id, Book.title, Book.author, Book.year, Book.count_pages, Book.seller_id)
+# Колонки страницы списка: поля ReturnedBook в порядке схемы и версия для ETag (см. services.serialization)
+BOOK_PAGE_COLUMNS = (*schema_columns(Book, ReturnedBook), Book.version)
+
+# Валидатор элементов пачки. Создается один раз, а не на каждый запрос.
+IncomingBookAdapter = TypeAdapter(IncomingBook)
 
 
 # Ручка для создания записи о книге в БД. Возвращает созданную книгу.
 @books_router.post("/", response_model=ReturnedBook, status_code=status.HTTP_201_CREATED)  # Прописываем модель ответа
 async def create_book(
-    book: IncomingBook, session: DBSession
+    book: IncomingBook, session: DBSession, cache: Cache
 ):  # прописываем модель валидирующую входные данные и сессию как зависимость.
     # это - бизнес логика. Обрабатываем данные, сохраняем, преобразуем и т.д.
     new_book = Book(
@@ -30,55 +75,289 @@ async def create_book(
     )
     session.add(new_book)
     await session.flush()
+    # Книги продавца входят в его карточку, поэтому она больше не актуальна
+    invalidate_on_commit(session, cache, seller_key(new_book.seller_id))
 
     return new_book
 
 
-# Ручка, возвращающая все книги
+# Ручка для массового создания книг. Все книги вставляются одним INSERT ... RETURNING
+# в одной транзакции: либо создаются все, либо ни одной.
+# Ошибки возвращаются по каждому элементу: {"detail": [{"index": 0, "errors": [...]}, ...]}
+# Элементы принимаются как есть и проверяются по IncomingBook в ручке, поэтому схему тела
+# для OpenAPI (массив IncomingBook) описываем явно.
+@books_router.post(
+    "/bulk",
+    response_model=ReturnedCreatedBooks,
+    status_code=status.HTTP_201_CREATED,
+    responses={422: {"description": "Ошибки валидации по каждому элементу пачки"}},
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": {"items": {"$ref": "#/components/schemas/IncomingBook"}}}}
+        }
+    },
+)
+async def create_books_bulk(payload: Annotated[list[Any], Body()], session: DBSession, cache: Cache):
+    if len(payload) > settings.max_bulk_size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Too many books in one request, max is {settings.max_bulk_size}",
+        )
+
+    # Валидируем всю пачку за один проход, собирая ошибки по индексам элементов
+    errors: dict[int, list[dict]] = defaultdict(list)
+    books: dict[int, IncomingBook] = {}
+    for index, item in enumerate(payload):
+        try:
+            books[index] = IncomingBookAdapter.validate_python(item)
+        except ValidationError as exc:
+            errors[index] = [
+                {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+                for error in exc.errors(include_url=False, include_context=False)
+            ]
+
+    # Проверяем существование продавцов одним запросом, а не на каждую книгу
+    if books:
+        seller_ids = {book.seller_id for book in books.values()}
+        res = await session.execute(select(Seller.id).where(Seller.id.in_(seller_ids)))
+        missing_sellers = seller_ids - set(res.scalars().all())
+        for index, book in books.items():
+            if book.seller_id in missing_sellers:
+                errors[index].append({"loc": ["seller_id"], "msg": "Seller not found", "type": "not_found"})
+
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{"index": index, "errors": errors[index]} for index in sorted(errors)],
+        )
+
+    if not books:
+        return {"books": []}
+
+    query = insert(Book).returning(*RETURNED_BOOK_COLUMNS, sort_by_parameter_order=True)
+    res = await session.execute(query, [book.model_dump() for book in books.values()])
+    invalidate_on_commit(session, cache, *(seller_key(seller_id) for seller_id in seller_ids))
+    return {"books": res.all()}
+
+
+# Ручка для массового удаления книг по списку ИД. Все книги удаляются одним DELETE ... RETURNING
+# в одной транзакции. Несуществующие ИД пропускаются, в ответе - ИД удаленных книг.
+@books_router.delete("/bulk", response_model=DeletedBooks)
+async def delete_books_bulk(book_ids: Annotated[list[int], Body()], session: DBSession, cache: Cache):
+    if len(book_ids) > settings.max_bulk_size:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Too many books in one request, max is {settings.max_bulk_size}",
+        )
+
+    if not book_ids:
+        return {"deleted": []}
+
+    query = delete(Book).where(Book.id == any_(book_ids)).returning(Book.id, Book.seller_id)
+    res = await session.execute(query.execution_options(synchronize_session=False))
+    deleted = res.all()
+    invalidate_on_commit(
+        session,
+        cache,
+        *(book_key(book.id) for book in deleted),
+        *(seller_key(seller_id) for seller_id in {book.seller_id for book in deleted}),
+    )
+    return {"deleted": sorted(book.id for book in deleted)}
+
+
+# Ручка, возвращающая все книги постранично.
+# Страница отдается сразу через orjson, без проверки каждой книги по ReturnedBook (см. services.serialization).
 @books_router.get("/", response_model=ReturnedAllBooks)
-async def get_all_books(session: DBSession):
+async def get_all_books(session: ReadSession, page: Pagination, if_none_match: IfNoneMatch = None):
+    # Если клиент прислал ETag, сначала сверяем дешевый отпечаток страницы
+    if if_none_match:
+        res = await session.execute(page_fingerprint_query(Book, page))
+        etag = page_etag("books", page, *res.one())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
     # Хотим видеть формат:
-    # books: [{"id": 1, "title": "Blabla", ...}, {"id": 2, ...}]
-    query = select(Book)
+    # books: [{"id": 1, "title": "Blabla", ...}, {"id": 2, ...}], next_cursor: 2
+    res = await session.execute(keyset_query(Book, page, *BOOK_PAGE_COLUMNS))
+    rows = res.all()
+    etag = page_etag("books", page, *rows_fingerprint(rows))
+    books, next_cursor = split_page(rows, page.limit)
+    return ORJSONResponse(
+        {"books": rows_as_dicts(books, ReturnedBook), "next_cursor": next_cursor}, headers={"ETag": etag}
+    )
+
+
+# Ручка поиска книг по началу названия или автора, полнотекстовому запросу, диапазону лет и продавцу.
+# Результат постраничный и отдается так же быстро, как и список всех книг.
+@books_router.get("/search", response_model=ReturnedAllBooks)
+async def search_books(session: ReadSession, page: Pagination, filters: Annotated[BookFilters, Depends()]):
+    query = build_search_query(keyset_query(Book, page, *BOOK_PAGE_COLUMNS), filters)
     res = await session.execute(query)
-    books = res.scalars().all()
-    return {"books": books}
+    books, next_cursor = split_page(res.all(), page.limit)
+    return ORJSONResponse({"books": rows_as_dicts(books, ReturnedBook), "next_cursor": next_cursor})
+
+
+# Ручка для получения нескольких книг по списку ИД (?ids=1&ids=2) одним запросом WHERE id = ANY(:ids).
+# Книги возвращаются в порядке запроса, ИД несуществующих книг - в missing. Без ids - пустой ответ.
+@books_router.get("/batch", response_model=ReturnedBatchBooks)
+async def get_books_batch(
+    loaders: RequestLoaders, ids: Annotated[tuple[int, ...], Query(max_length=settings.max_page_size)] = ()
+):
+    ids = list(dict.fromkeys(ids))
+    found = await loaders.books.load_many(ids)
+    return {
+        "books": [book for book in found if book is not None],
+        "missing": [book_id for book_id, book in zip(ids, found) if book is None],
+    }
 
 
-# Ручка для получения книги по ее ИД
+# Ручка для потоковой выгрузки всего каталога (NDJSON или CSV).
+# Сессию открываем внутри генератора: зависимость закрывается раньше, чем отдается тело ответа.
+@books_router.get("/export", response_class=StreamingResponse)
+async def export_books(session_factory: SessionFactory, format: Literal["ndjson", "csv"] = "ndjson"):
+    media_type, _ = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_books(session_factory, format, settings.export_chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
+
+
+# Ручка для получения книги по ее ИД. Сначала смотрим в кэш, потом в БД.
+# В кэше храним готовое тело ответа вместе с ETag. Прочитанное с реплики в кэш не кладем (см. reads_from_replica).
 @books_router.get("/{book_id}", response_model=ReturnedBook)
-async def get_book(book_id: int, session: DBSession):
-    res = await session.get(Book, book_id)
-    return res
+async def get_book(
+    book_id: int, session: ReadSession, cache: Cache, response: Response, if_none_match: IfNoneMatch = None
+):
+    key = book_key(book_id)
+    if (entry := await cache.get(key)) is None:
+        if not (book := await session.get(Book, book_id)):
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+        entry = {
+            "etag": make_etag("book", book.id, book.version),
+            "body": ReturnedBook.model_validate(book, from_attributes=True).model_dump(),
+        }
+        if not reads_from_replica(session):
+            await cache.set(key, entry)
 
+    if etag_matches(if_none_match, entry["etag"]):
+        return not_modified(entry["etag"])
 
-# Ручка для удаления книги
+    response.headers["ETag"] = entry["etag"]
+    return entry["body"]
+
+
+# Ручка для удаления книги. Один DELETE ... RETURNING, без предварительной загрузки книги.
+# С If-Match удаляет, только если книга не менялась.
+# Если книги нет, предусловие If-Match тоже не выполнено: 412.
 @books_router.delete("/{book_id}")
-async def delete_book(book_id: int, session: DBSession):
-    deleted_book = await session.get(Book, book_id)
-    ic(deleted_book)  # Красивая и информативная замена для print. Полезна при отладке.
-    if deleted_book:
-        await session.delete(deleted_book)
+async def delete_book(book_id: int, session: DBSession, cache: Cache, if_match: IfMatch = None):
+    query = delete(Book).where(Book.id == book_id).returning(Book.seller_id)
+    versions = if_match_versions(if_match, "book", book_id)
+    if versions is not None:
+        query = query.where(Book.version.in_(versions))
+    res = await session.execute(query.execution_options(synchronize_session=False))
+
+    if (seller_id := res.scalar_one_or_none()) is not None:
+        logger.debug("Deleted book %s", book_id)
+        invalidate_on_commit(session, cache, book_key(book_id), seller_key(seller_id))
+    elif if_match:
+        # Не совпала версия из If-Match или книги нет вовсе - в обоих случаях предусловие не выполнено
+        return conflict(if_match)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)  # Response может вернуть текст и метаданные.
 
 
-# Ручка для обновления данных о книге
+# Ручка для обновления данных о книге. С If-Match обновляет, только если книга не менялась.
+# С If-Match на несуществующую книгу - 412, а не 404 (RFC 9110, 13.1.1).
 @books_router.put("/{book_id}")
-async def update_book(book_id: int, new_data: ReturnedBook, session: DBSession):
+async def update_book(
+    book_id: int, new_data: ReturnedBook, session: DBSession, cache: Cache, response: Response, if_match: IfMatch = None
+):
     # Оператор "морж", позволяющий одновременно и присвоить значение и проверить его.
     if updated_book := await session.get(Book, book_id):
+        versions = if_match_versions(if_match, "book", book_id)
+        if versions is not None and updated_book.version not in versions:
+            return conflict(if_match)
+
+        old_seller_id = updated_book.seller_id
         updated_book.author = new_data.author
         updated_book.title = new_data.title
         updated_book.year = new_data.year
         updated_book.count_pages = new_data.count_pages
         updated_book.seller_id = new_data.seller_id
 
-        await session.flush()
+        try:
+            # Версию увеличивает ORM (version_id_col), UPDATE выполнится, только если она не изменилась с чтения
+            await session.flush()
+        except StaleDataError:
+            await session.rollback()
+            return conflict(if_match)
 
+        # Книга могла перейти к другому продавцу - сбрасываем карточки обоих
+        invalidate_on_commit(session, cache, book_key(book_id), seller_key(old_seller_id), seller_key(new_data.seller_id))
+        response.headers["ETag"] = make_etag("book", updated_book.id, updated_book.version)
         return updated_book
 
+    if if_match:
+        return conflict(if_match)
     return Response(status_code=status.HTTP_404_NOT_FOUND)
 
 
+# Ручка для частичного обновления книги. Меняет только переданные поля одним
+# UPDATE ... RETURNING, без предварительного SELECT.
+# С If-Match версия проверяется в том же UPDATE: если книгу успели изменить, строка не найдется.
+# Не найденная с If-Match книга - 412, без If-Match - 404.
+@books_router.patch("/{book_id}", response_model=ReturnedBook)
+async def patch_book(
+    book_id: int, changes: PatchBook, session: DBSession, cache: Cache, response: Response, if_match: IfMatch = None
+):
+    values = changes.model_dump(exclude_unset=True)
+    versions = if_match_versions(if_match, "book", book_id)
+    if not values:
+        # Менять нечего: отдаем книгу как есть, версия не растет
+        res = await session.execute(select(*RETURNED_BOOK_COLUMNS, Book.version).where(Book.id == book_id))
+        if (book := res.one_or_none()) is None:
+            return conflict(if_match) if if_match else Response(status_code=status.HTTP_404_NOT_FOUND)
+        if versions is not None and book.version not in versions:
+            return conflict(if_match)
+        response.headers["ETag"] = make_etag("book", book.id, book.version)
+        return book
+
+    query = (
+        update(Book)
+        .values(**values, version=Book.version + 1)
+        .returning(*RETURNED_BOOK_COLUMNS, Book.version)
+        .execution_options(synchronize_session=False)
+    )
+    if "seller_id" in values:
+        # Книга может перейти к другому продавцу, и сбросить нужно карточки обоих.
+        # Прежнего продавца берем из подзапроса в том же UPDATE: подзапрос видит строку до изменения,
+        # а FOR UPDATE не дает параллельному запросу поменять ее между чтением и записью.
+        old = select(Book.id, Book.seller_id).where(Book.id == book_id).with_for_update().subquery()
+        query = query.where(Book.id == old.c.id).returning(old.c.seller_id.label("old_seller_id"))
+    else:
+        query = query.where(Book.id == book_id)
+    if versions is not None:
+        query = query.where(Book.version.in_(versions))
+
+    try:
+        res = await session.execute(query)
+    except IntegrityError:
+        # Единственный внешний ключ книги - продавец
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{"loc": ["body", "seller_id"], "msg": "Seller not found", "type": "not_found"}],
+        )
+
+    if (book := res.one_or_none()) is None:
+        # Не совпала версия из If-Match или книги нет: с If-Match это 412 в обоих случаях
+        if if_match:
+            return conflict(if_match)
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
 
+    seller_ids = {book.seller_id, getattr(book, "old_seller_id", book.seller_id)}
+    invalidate_on_commit(session, cache, book_key(book_id), *(seller_key(seller_id) for seller_id in seller_ids))
+    response.headers["ETag"] = make_etag("book", book.id, book.version)
+    return book
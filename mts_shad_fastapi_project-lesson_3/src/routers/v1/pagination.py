@@ -0,0 +1,58 @@
+from typing import Annotated, Optional, Sequence
+
+from fastapi import Depends, Query
+from sqlalchemy import Select, func, select
+
+from configurations.settings import settings
+from services.etag import make_etag
+
+__all__ = ["PageParams", "Pagination", "keyset_query", "page_etag", "page_fingerprint_query", "split_page"]
+
+
+# Параметры keyset-пагинации. Вместо OFFSET используем курсор по id:
+# "WHERE id > :after ORDER BY id LIMIT :limit" работает за одинаковое время
+# на любой странице, так как идет по индексу первичного ключа.
+class PageParams:
+    def __init__(
+        self,
+        limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = settings.default_page_size,
+        after: Annotated[Optional[int], Query(ge=0, description="id последней записи предыдущей страницы")] = None,
+    ):
+        self.limit = limit
+        self.after = after
+
+
+Pagination = Annotated[PageParams, Depends()]
+
+
+# Запрашиваем из БД на одну запись больше, чем limit. Если она пришла -
+# значит есть следующая страница и курсором для нее служит id последней записи текущей.
+def split_page(rows: Sequence, limit: int) -> tuple[Sequence, Optional[int]]:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+# Запрос страницы: limit + 1 записей с id больше курсора
+def keyset_query(model, page: PageParams, *columns) -> Select:
+    query = select(*columns) if columns else select(model)
+    query = query.order_by(model.id).limit(page.limit + 1)
+    if page.after is not None:
+        query = query.where(model.id > page.after)
+    return query
+
+
+# Запрос отпечатка страницы (см. rows_fingerprint) без выборки самих записей.
+# Нужен, чтобы ответить 304 на If-None-Match, не читая и не сериализуя страницу.
+def page_fingerprint_query(model, page: PageParams) -> Select:
+    window = keyset_query(model, page, model.id, model.version).subquery()
+    return select(
+        func.count(),
+        func.coalesce(func.max(window.c.id), 0),
+        func.coalesce(func.sum(window.c.version), 0),
+    ).select_from(window)
+
+
+def page_etag(kind: str, page: PageParams, count: int, max_id: int, sum_version: int) -> str:
+    return make_etag(kind, page.after or 0, page.limit, count, max_id, sum_version)
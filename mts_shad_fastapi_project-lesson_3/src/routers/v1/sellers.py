@@ -1,86 +1,375 @@
-from typing import Annotated
+import logging
+from typing import Annotated, Literal, Optional
 
-from fastapi import APIRouter, Depends, Response, status
-from icecream import ic
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import JSON, Text, delete, func, literal_column, select, true, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from configurations.database import get_async_session
+from configurations.database import get_async_session, get_read_session, reads_from_replica
+from configurations.settings import settings
+from models.books import Book
+from models.seller_stats import SellerStats
 from models.sellers import Seller
-from schemas.sellers import IncomingSeller, ReturnedAllSellers, ReturnedSeller, ReturnedSellerAndBooks
+from schemas.sellers import (
+    IncomingSeller,
+    PatchSeller,
+    ReturnedAllSellers,
+    ReturnedBatchSellers,
+    ReturnedLeaderboard,
+    ReturnedSeller,
+    ReturnedSellerAndBooks,
+    ReturnedSellerStats,
+)
+from services.cache import CacheBackend, book_key, get_cache, invalidate_on_commit, seller_key
+from services.etag import (
+    IfMatch,
+    IfNoneMatch,
+    conflict,
+    etag_matches,
+    if_match_versions,
+    make_etag,
+    not_modified,
+    rows_fingerprint,
+)
+from services.loaders import RequestLoaders
+from services.passwords import PasswordHasher, get_password_hasher
+from services.serialization import rows_as_dicts, schema_columns
+
+from .pagination import Pagination, keyset_query, page_etag, page_fingerprint_query, split_page
 
 #import eventlet
 #from eventlet import monkey_patch
 #monkey_patch()
 
 sellers_router = APIRouter(tags=["sellers"], prefix="/sellers")
+logger = logging.getLogger(__name__)
 
 # Больше не симулируем хранилище данных. Подключаемся к реальному, через сессию.
 DBSession = Annotated[AsyncSession, Depends(get_async_session)]
+# Сессия без транзакции для ручек, которые только читают
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+Cache = Annotated[CacheBackend, Depends(get_cache)]
+Hasher = Annotated[PasswordHasher, Depends(get_password_hasher)]
+
+# Колонки страницы списка: поля ReturnedSeller в порядке схемы и версия для ETag (см. services.serialization)
+SELLER_PAGE_COLUMNS = (*schema_columns(Seller, ReturnedSeller), Seller.version)
+
+# Колонки, из которых собирается ReturnedSellerStats
+STATS_COLUMNS = (
+    SellerStats.seller_id,
+    SellerStats.books_count,
+    SellerStats.total_pages,
+    SellerStats.min_year,
+    SellerStats.max_year,
+)
 
 
 # Ручка для создания записи о продавце в БД. Возвращает созданного продавца.
 @sellers_router.post("/", response_model=ReturnedSeller, status_code=status.HTTP_201_CREATED)  # Прописываем модель ответа
 async def create_seller(
-    seller: IncomingSeller, session: DBSession
+    seller: IncomingSeller, session: DBSession, hasher: Hasher
 ):  # прописываем модель валидирующую входные данные и сессию как зависимость.
     # это - бизнес логика. Обрабатываем данные, сохраняем, преобразуем и т.д.
     new_seller = Seller(
         first_name=seller.first_name,
         last_name=seller.last_name,
         email=seller.email,
-        password=seller.password,
+        password=await hasher.hash(seller.password),
     )
     session.add(new_seller)
     await session.flush()
 
     return new_seller
 
-# Ручка, возвращающая всех продавцов
+# Ручка, возвращающая всех продавцов постранично. Как и список книг, отдается сразу через orjson.
 @sellers_router.get("/", response_model=ReturnedAllSellers)
-async def get_all_sellers(session: DBSession):
-    query = select(Seller)
+async def get_all_sellers(session: ReadSession, page: Pagination, if_none_match: IfNoneMatch = None):
+    # Если клиент прислал ETag, сначала сверяем дешевый отпечаток страницы
+    if if_none_match:
+        res = await session.execute(page_fingerprint_query(Seller, page))
+        etag = page_etag("sellers", page, *res.one())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    res = await session.execute(keyset_query(Seller, page, *SELLER_PAGE_COLUMNS))
+    rows = res.all()
+    etag = page_etag("sellers", page, *rows_fingerprint(rows))
+    sellers, next_cursor = split_page(rows, page.limit)
+    return ORJSONResponse(
+        {"sellers": rows_as_dicts(sellers, ReturnedSeller), "next_cursor": next_cursor}, headers={"ETag": etag}
+    )
+
+
+# Ручка для получения нескольких продавцов по списку ИД (?ids=1&ids=2) одним запросом, без их книг.
+# Продавцы возвращаются в порядке запроса, ИД несуществующих - в missing. Без ids - пустой ответ.
+@sellers_router.get("/batch", response_model=ReturnedBatchSellers)
+async def get_sellers_batch(
+    loaders: RequestLoaders, ids: Annotated[tuple[int, ...], Query(max_length=settings.max_page_size)] = ()
+):
+    ids = list(dict.fromkeys(ids))
+    found = await loaders.sellers.load_many(ids)
+    return {
+        "sellers": [seller for seller in found if seller is not None],
+        "missing": [seller_id for seller_id, seller in zip(ids, found) if seller is None],
+    }
+
+
+# Ручка рейтинга продавцов по количеству книг или сумме страниц. Читает готовую сводку
+# (см. models.seller_stats) обратным проходом по индексу, книги не перебираются.
+@sellers_router.get("/leaderboard", response_model=ReturnedLeaderboard)
+async def get_leaderboard(
+    session: ReadSession,
+    by: Literal["books_count", "total_pages"] = "books_count",
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_size)] = 10,
+):
+    query = (
+        select(*STATS_COLUMNS, Seller.first_name, Seller.last_name)
+        .join(Seller, Seller.id == SellerStats.seller_id)
+        .where(SellerStats.books_count > 0)
+        .order_by(getattr(SellerStats, by).desc(), SellerStats.seller_id.desc())
+        .limit(limit)
+    )
+    res = await session.execute(query)
+    return {"sellers": res.all()}
+
+
+# Ручка статистики продавца по его книгам. Одна строка сводной таблицы, время ответа не зависит от числа книг.
+@sellers_router.get("/{seller_id}/stats", response_model=ReturnedSellerStats)
+async def get_seller_stats(seller_id: int, session: ReadSession):
+    # У продавца, который еще не добавлял книг, строки в сводке нет
+    query = (
+        select(
+            Seller.id.label("seller_id"),
+            func.coalesce(SellerStats.books_count, 0).label("books_count"),
+            func.coalesce(SellerStats.total_pages, 0).label("total_pages"),
+            SellerStats.min_year,
+            SellerStats.max_year,
+        )
+        .outerjoin(SellerStats, SellerStats.seller_id == Seller.id)
+        .where(Seller.id == seller_id)
+    )
     res = await session.execute(query)
-    sellers = res.scalars().all()
-    return {"sellers": sellers}
+    if (stats := res.one_or_none()) is None:
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return stats
+
 
-# Ручка для получения данных о продавце
+# Ручка для получения данных о продавце вместе с его книгами. Сначала смотрим в кэш.
+# Иначе карточку целиком собирает Postgres (см. _load_seller_card), а ручка отдает готовый JSON как есть,
+# без разбора и проверки по ReturnedSellerAndBooks. response_model остается для OpenAPI.
+# books_limit ограничивает число книг в карточке (первые по ИД), полное число книг - в заголовке X-Books-Total.
+# Карточка с ограничением не кэшируется: сброс кэша при изменении книг знает только полную карточку.
+# Карточка, прочитанная с реплики, тоже не кэшируется (см. reads_from_replica).
 @sellers_router.get("/{seller_id}", response_model=ReturnedSellerAndBooks)
-async def get_seller(seller_id: int, session: DBSession):    
-    #db_parent = session.execute(Seller)
-    #parent_data = ReturnedSellerAndBooks.construct(db_parent)
-    res = await session.get(Seller, seller_id)    
+async def get_seller(
+    seller_id: int,
+    session: ReadSession,
+    cache: Cache,
+    if_none_match: IfNoneMatch = None,
+    books_limit: Annotated[Optional[int], Query(ge=0, le=settings.max_page_size)] = None,
+):
+    key = seller_key(seller_id)
+    if books_limit is not None or (entry := await cache.get(key)) is None:
+        if not (entry := await _load_seller_card(session, seller_id, books_limit)):
+            return Response(status_code=status.HTTP_404_NOT_FOUND)
+        if books_limit is None and not reads_from_replica(session):
+            await cache.set(key, entry)
+
+    headers = {"ETag": entry["etag"], "X-Books-Total": str(entry["books_total"])}
+    if etag_matches(if_none_match, entry["etag"]):
+        return not_modified(entry["etag"])
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
 
-    #res = await session.get(Seller, seller_id)
-    return res
+# Карточка продавца одним запросом: JSON ответа собирается в БД, ключи - в порядке полей
+# ReturnedSellerAndBooks и BaseBook. Там же считается отпечаток книг для ETag.
+# JSON строит row_to_json по LATERAL-подзапросам с одними полями схемы: в отличие от json_build_object
+# и json_agg он пишет без пробелов, и ответ совпадает байт в байт с ответом через pydantic и orjson.
+# Книги склеивает string_agg в порядке ИД, не больше books_limit.
+# Карточку берем как text: тип json драйвер разобрал бы в dict.
+async def _load_seller_card(
+    session: AsyncSession, seller_id: int, books_limit: Optional[int] = None
+) -> Optional[dict]:
+    numbered = (
+        select(
+            Book.id,
+            Book.version,
+            Book.title,
+            Book.author,
+            Book.year,
+            Book.seller_id,
+            func.row_number().over(order_by=Book.id).label("position"),
+        )
+        .where(Book.seller_id == seller_id)
+        .subquery("numbered")
+    )
+    book = (
+        select(numbered.c.title, numbered.c.author, numbered.c.year, numbered.c.seller_id)
+        .correlate(numbered)
+        .lateral("book")
+    )
+    book_json = func.string_agg(
+        func.row_to_json(book.table_valued()).cast(Text), aggregate_order_by(literal_column("','"), numbered.c.id)
+    )
+    if books_limit is not None:
+        book_json = book_json.filter(numbered.c.position <= books_limit)
+    books = (
+        select(
+            func.count().label("total"),
+            # Отпечаток книг: md5 от всех пар "ИД:версия" по порядку ИД. В отличие от количества, max id
+            # и суммы версий он не совпадает у разных наборов книг, поэтому ETag можно отдавать как сильный.
+            func.md5(
+                func.coalesce(
+                    func.string_agg(
+                        func.concat(numbered.c.id, ":", numbered.c.version),
+                        aggregate_order_by(literal_column("','"), numbered.c.id),
+                    ),
+                    "",
+                )
+            ).label("fingerprint"),
+            # concat пропускает NULL: у продавца без книг получится пустой массив
+            func.concat("[", book_json, "]").label("books"),
+        )
+        .select_from(numbered)
+        .join(book, true())
+        .subquery("books")
+    )
+
+    card = (
+        select(Seller.first_name, Seller.last_name, Seller.email, Seller.id, books.c.books.cast(JSON).label("books"))
+        .correlate(Seller, books)
+        .lateral("card")
+    )
+    query = (
+        select(
+            Seller.version,
+            books.c.total,
+            books.c.fingerprint,
+            func.row_to_json(card.table_valued()).cast(Text).label("body"),
+        )
+        .join_from(Seller, books, true())
+        .join(card, true())
+        .where(Seller.id == seller_id)
+    )
+    res = await session.execute(query)
+    if (card := res.one_or_none()) is None:
+        return None
+
+    # Карточка меняется и при изменении продавца, и при изменении любой его книги.
+    # Урезанная карточка - другое представление, у нее свой ETag.
+    etag_parts = ["seller", seller_id, card.version, card.fingerprint]
+    if books_limit is not None:
+        etag_parts.append(books_limit)
+    return {"etag": make_etag(*etag_parts), "books_total": card.total, "body": card.body}
 
-         
-    
-      
-     
 
-# Ручка для удаления данных о продавце
+# Ручка для удаления продавца вместе со всеми его книгами. Книги удаляет БД (ON DELETE CASCADE),
+# весь запрос - один DELETE ... RETURNING. ИД книг для сброса кэша возвращаем из того же запроса:
+# подзапрос в RETURNING видит снимок до удаления, а каскад срабатывает в конце запроса.
+# С If-Match удаляет, только если продавец не менялся.
+# Если продавца нет, предусловие If-Match тоже не выполнено: 412.
 @sellers_router.delete("/{seller_id}")
-async def delete_book(seller_id: int, session: DBSession):
-    deleted_seller = await session.get(Seller, seller_id)
-    ic(deleted_seller)  # Красивая и информативная замена для print. Полезна при отладке.
-    if deleted_seller:
-        await session.delete(deleted_seller)
+async def delete_seller(seller_id: int, session: DBSession, cache: Cache, if_match: IfMatch = None):
+    book_ids = select(func.array_agg(Book.id)).where(Book.seller_id == Seller.id).scalar_subquery()
+    query = delete(Seller).where(Seller.id == seller_id).returning(book_ids)
+    versions = if_match_versions(if_match, "seller", seller_id)
+    if versions is not None:
+        query = query.where(Seller.version.in_(versions))
+    res = await session.execute(query.execution_options(synchronize_session=False))
+
+    if row := res.one_or_none():
+        logger.debug("Deleted seller %s", seller_id)
+        invalidate_on_commit(session, cache, seller_key(seller_id), *(book_key(book_id) for book_id in row[0] or ()))
+    elif if_match:
+        # Не совпала версия из If-Match или продавца нет вовсе - в обоих случаях предусловие не выполнено
+        return conflict(if_match)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)  # Response может вернуть текст и метаданные.
 
-# Ручка для обновления данных о продавце
-@sellers_router.put("/{seller_id}")
-async def update_seller(seller_id: int, new_data: IncomingSeller, session: DBSession):
+
+# Ручка для обновления данных о продавце. С If-Match обновляет, только если продавец не менялся.
+# С If-Match на несуществующего продавца - 412, а не 404 (RFC 9110, 13.1.1).
+# Ответ проходит через ReturnedSeller: хеш пароля и версия наружу не попадают.
+@sellers_router.put("/{seller_id}", response_model=ReturnedSeller)
+async def update_seller(
+    seller_id: int,
+    new_data: IncomingSeller,
+    session: DBSession,
+    cache: Cache,
+    hasher: Hasher,
+    response: Response,
+    if_match: IfMatch = None,
+):
     # Оператор "морж", позволяющий одновременно и присвоить значение и проверить его.
     if updated_seller := await session.get(Seller, seller_id):
+        versions = if_match_versions(if_match, "seller", seller_id)
+        if versions is not None and updated_seller.version not in versions:
+            return conflict(if_match)
+
         updated_seller.first_name = new_data.first_name
         updated_seller.last_name = new_data.last_name
         updated_seller.email = new_data.email
-        updated_seller.password = new_data.password
+        updated_seller.password = await hasher.hash(new_data.password)
 
-        await session.flush()
+        try:
+            # Версию увеличивает ORM (version_id_col), UPDATE выполнится, только если она не изменилась с чтения
+            await session.flush()
+        except StaleDataError:
+            await session.rollback()
+            return conflict(if_match)
 
+        invalidate_on_commit(session, cache, seller_key(seller_id))
+        response.headers["ETag"] = make_etag("seller", updated_seller.id, updated_seller.version)
         return updated_seller
 
-    return Response(status_code=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+    if if_match:
+        return conflict(if_match)
+    return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+
+# Ручка для частичного обновления продавца. Меняет только переданные поля одним
+# UPDATE ... RETURNING, без предварительного SELECT.
+# С If-Match версия проверяется в том же UPDATE (см. patch_book).
+@sellers_router.patch("/{seller_id}", response_model=ReturnedSeller)
+async def patch_seller(
+    seller_id: int,
+    changes: PatchSeller,
+    session: DBSession,
+    cache: Cache,
+    hasher: Hasher,
+    response: Response,
+    if_match: IfMatch = None,
+):
+    values = changes.model_dump(exclude_unset=True)
+    versions = if_match_versions(if_match, "seller", seller_id)
+    returned_columns = (Seller.id, Seller.first_name, Seller.last_name, Seller.email, Seller.version)
+    if not values:
+        # Менять нечего: отдаем продавца как есть, версия не растет
+        query = select(*returned_columns).where(Seller.id == seller_id)
+    else:
+        if "password" in values:
+            values["password"] = await hasher.hash(values["password"])
+        query = (
+            update(Seller)
+            .where(Seller.id == seller_id)
+            .values(**values, version=Seller.version + 1)
+            .returning(*returned_columns)
+            .execution_options(synchronize_session=False)
+        )
+    if versions is not None:
+        query = query.where(Seller.version.in_(versions))
+    res = await session.execute(query)
+
+    if (seller := res.one_or_none()) is None:
+        # Не совпала версия из If-Match или продавца нет: с If-Match это 412 в обоих случаях
+        if if_match:
+            return conflict(if_match)
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+
+    if values:
+        invalidate_on_commit(session, cache, seller_key(seller_id))
+    response.headers["ETag"] = make_etag("seller", seller.id, seller.version)
+    return seller
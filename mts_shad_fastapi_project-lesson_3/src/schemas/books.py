@@ -1,7 +1,17 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field, field_validator
 from pydantic_core import PydanticCustomError
 
-__all__ = ["IncomingBook", "ReturnedAllBooks", "ReturnedBook"]
+__all__ = [
+    "DeletedBooks",
+    "IncomingBook",
+    "PatchBook",
+    "ReturnedAllBooks",
+    "ReturnedBatchBooks",
+    "ReturnedBook",
+    "ReturnedCreatedBooks",
+]
 
 
 # Базовый класс "Книги", содержащий поля, которые есть во всех классах-наследниках.
@@ -21,9 +31,38 @@ class IncomingBook(BaseBook):
     @field_validator("year")  # Валидатор, проверяет что дата не слишком древняя
     @staticmethod
     def validate_year(val: int):
-        if val < 1900:
-            raise PydanticCustomError("Validation error", "Year is wrong!")
-        return val
+        return check_year(val)
+
+
+def check_year(val: int) -> int:
+    if val < 1900:
+        raise PydanticCustomError("Validation error", "Year is wrong!")
+    return val
+
+
+# Запрещает явный null в частичном обновлении: все колонки NOT NULL.
+# Значения по умолчанию не валидируются, поэтому пропущенные поля сюда не попадают.
+def reject_null(val):
+    if val is None:
+        raise PydanticCustomError("Validation error", "Field can't be null!")
+    return val
+
+
+# Класс для частичного обновления книги (PATCH). Меняются только переданные поля,
+# поэтому из модели берем model_dump(exclude_unset=True).
+class PatchBook(BaseModel):
+    title: Optional[str] = None
+    author: Optional[str] = None
+    year: Optional[int] = None
+    count_pages: Optional[int] = None
+    seller_id: Optional[int] = None
+
+    _not_null = field_validator("*", mode="before")(reject_null)
+
+    @field_validator("year")
+    @staticmethod
+    def validate_year(val: int):
+        return check_year(val)
 
 
 # Класс, валидирующий исходящие данные. Он уже содержит id
@@ -32,8 +71,24 @@ class ReturnedBook(BaseBook):
     count_pages: int
 
 
-# Класс для возврата массива объектов "Книга"
+# Класс для возврата массива объектов "Книга".
+# next_cursor - значение для параметра after следующей страницы, None если страница последняя.
 class ReturnedAllBooks(BaseModel):
     books: list[ReturnedBook]
+    next_cursor: Optional[int] = None
+
+
+# Класс для возврата книг, запрошенных списком ИД. missing - ИД, для которых книг нет.
+class ReturnedBatchBooks(BaseModel):
+    books: list[ReturnedBook]
+    missing: list[int]
+
+
+# Класс для возврата книг, созданных одним запросом на массовое создание
+class ReturnedCreatedBooks(BaseModel):
+    books: list[ReturnedBook]
 
 
+# Класс для возврата ИД книг, удаленных одним запросом на массовое удаление
+class DeletedBooks(BaseModel):
+    deleted: list[int]
@@ -1,9 +1,21 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field, field_validator
 from pydantic_core import PydanticCustomError
 
-from schemas.books import BaseBook
+from schemas.books import BaseBook, reject_null
 
-__all__ = ["IncomingSeller", "ReturnedAllSellers", "ReturnedSeller", "ReturnedSellerAndBooks"]
+__all__ = [
+    "IncomingSeller",
+    "LeaderboardSeller",
+    "PatchSeller",
+    "ReturnedAllSellers",
+    "ReturnedBatchSellers",
+    "ReturnedLeaderboard",
+    "ReturnedSeller",
+    "ReturnedSellerAndBooks",
+    "ReturnedSellerStats",
+]
 
 
 # Базовый класс "Продавцы", содержащий поля, которые есть во всех классах-наследниках.
@@ -11,34 +23,74 @@ class BaseSeller(BaseModel):
     first_name: str
     last_name: str
     email: str
-  
+
+
 # Класс для валидации входящих данных. Не содержит id так как его присваивает БД.
-class IncomingSeller(BaseSeller):    
+class IncomingSeller(BaseSeller):
     password: str
 
     @field_validator("password")  # Валидатор проверяет, что пароль не слишком короткий
     @staticmethod
     def validate_password(val: str):
-        if len(val) < 8:
-            raise PydanticCustomError("Validation error", "Password is short!")
-        return val
+        return check_password(val)
+
+
+def check_password(val: str) -> str:
+    if len(val) < 8:
+        raise PydanticCustomError("Validation error", "Password is short!")
+    return val
+
+
+# Класс для частичного обновления продавца (PATCH), см. PatchBook
+class PatchSeller(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+
+    _not_null = field_validator("*", mode="before")(reject_null)
+
+    @field_validator("password")
+    @staticmethod
+    def validate_password(val: str):
+        return check_password(val)
 
 
 # Класс, валидирующий исходящие данные. Он уже содержит id
-class ReturnedSeller(BaseSeller):    
+class ReturnedSeller(BaseSeller):
     id: int
-        
+
 
 # Класс для возврата массива объектов "Книга"
 class ReturnedAllSellers(BaseModel):
     sellers: list[ReturnedSeller]
-        
+    next_cursor: Optional[int] = None
+
+
+# Класс для возврата продавцов, запрошенных списком ИД (см. ReturnedBatchBooks)
+class ReturnedBatchSellers(BaseModel):
+    sellers: list[ReturnedSeller]
+    missing: list[int]
+
 
 class ReturnedSellerAndBooks(ReturnedSeller):
     books: list[BaseBook]
 
 
+# Класс для возврата статистики продавца по его книгам. Годы пустые, если книг нет.
+class ReturnedSellerStats(BaseModel):
+    seller_id: int
+    books_count: int
+    total_pages: int
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+
+
+# Строка рейтинга продавцов
+class LeaderboardSeller(ReturnedSellerStats):
+    first_name: str
+    last_name: str
 
 
-    
-    
+class ReturnedLeaderboard(BaseModel):
+    sellers: list[LeaderboardSeller]
@@ -0,0 +1,86 @@
+"""Точка входа для запуска приложения в проде.
+
+Запускает uvicorn с несколькими процессами-воркерами. Каждый воркер - отдельный процесс
+со своим event loop, своим движком БД и пулом соединений (движок создается в lifespan воркера).
+Если установлены uvloop и httptools (uvicorn[standard]), используются они: это быстрее
+стандартных asyncio и h11.
+
+По SIGTERM воркеры перестают принимать новые соединения, дожидаются завершения текущих
+запросов (не дольше --graceful-timeout секунд) и закрывают соединения с БД.
+
+Все параметры по умолчанию берутся из настроек (SERVER_* в .env), аргументы командной строки
+их переопределяют. Запуск из папки src:
+    python server.py --workers 4 --port 8000
+"""
+
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from configurations.settings import settings
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers, help="0 - по числу ядер")
+    parser.add_argument(
+        "--backlog", type=int, default=settings.server_backlog, help="очередь соединений, ожидающих accept"
+    )
+    parser.add_argument(
+        "--keep-alive",
+        type=int,
+        default=settings.server_keep_alive,
+        help="сколько секунд держать простаивающее keep-alive соединение",
+    )
+    parser.add_argument(
+        "--limit-concurrency",
+        type=int,
+        default=settings.server_limit_concurrency,
+        help="максимум одновременных соединений на воркер, сверх него - ответ 503",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=settings.server_graceful_timeout,
+        help="сколько секунд ждать завершения текущих запросов при остановке",
+    )
+    parser.add_argument("--log-level", default=settings.log_level.lower())
+    return parser.parse_args(argv)
+
+
+def uvicorn_options(args: argparse.Namespace) -> dict:
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers or _cpu_count(),
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "limit_concurrency": args.limit_concurrency or None,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "log_level": args.log_level,
+        "access_log": False,  # время и коды ответов собирает MetricsMiddleware, построчный лог на каждый запрос дорог
+        "proxy_headers": True,
+        "forwarded_allow_ips": settings.server_forwarded_allow_ips,
+    }
+
+
+def _cpu_count() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def main(argv=None) -> None:
+    uvicorn.run("main:app", **uvicorn_options(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
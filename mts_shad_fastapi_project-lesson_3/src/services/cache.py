@@ -0,0 +1,192 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configurations.database import on_commit
+from configurations.settings import settings
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # redis - необязательная зависимость, нужна только для общего кэша
+    aioredis = None
+
+__all__ = [
+    "CacheBackend",
+    "MemoryCache",
+    "NullCache",
+    "RedisCache",
+    "book_key",
+    "create_cache",
+    "get_cache",
+    "invalidate_on_commit",
+    "seller_key",
+]
+
+
+def book_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def seller_key(seller_id: int) -> str:
+    return f"seller:{seller_id}"
+
+
+# Счетчики попаданий и промахов кэша
+@dataclass
+class CacheCounters:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0  # вытеснено из-за ограничения размера (LRU)
+    expirations: int = 0  # удалено по истечении TTL
+
+
+# Общий интерфейс кэша. Значения - то, что можно сериализовать в JSON (словари ответов).
+class CacheBackend(ABC):
+    name: str
+
+    def __init__(self):
+        self.counters = CacheCounters()
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any) -> None: ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **asdict(self.counters)}
+
+
+# Кэш в памяти процесса: TTL + вытеснение давно не использованных записей (LRU).
+class MemoryCache(CacheBackend):
+    name = "memory"
+
+    def __init__(self, ttl: float, max_entries: int):
+        super().__init__()
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.counters.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.counters.expirations += 1
+            self.counters.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.counters.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+            self.counters.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._data)}
+
+
+# Общий кэш для всех воркеров в Redis. Вытеснение и TTL выполняет сам Redis.
+class RedisCache(CacheBackend):
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float):
+        if aioredis is None:
+            raise RuntimeError("Package 'redis' is required for cache_backend='redis'")
+
+        super().__init__()
+        self._ttl = ttl
+        self._client = aioredis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(key)
+        if raw is None:
+            self.counters.misses += 1
+            return None
+
+        self.counters.hits += 1
+        return orjson.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self._client.set(key, orjson.dumps(value), px=int(self._ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def clear(self) -> None:
+        await self._client.flushdb()
+
+
+# Кэш-заглушка, когда кэширование выключено
+class NullCache(CacheBackend):
+    name = "none"
+
+    async def get(self, key: str) -> Optional[Any]:
+        self.counters.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        pass
+
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+def create_cache(backend: str = settings.cache_backend) -> CacheBackend:
+    if backend == "memory":
+        return MemoryCache(ttl=settings.cache_ttl, max_entries=settings.cache_max_entries)
+    if backend == "redis":
+        return RedisCache(url=settings.cache_redis_url, ttl=settings.cache_ttl)
+    if backend == "none":
+        return NullCache()
+
+    raise ValueError({"message": f"Unknown cache backend: {backend}"})
+
+
+__cache: Optional[CacheBackend] = None
+
+
+# Зависимость для ручек. Кэш создается один раз на процесс.
+def get_cache() -> CacheBackend:
+    global __cache
+
+    if __cache is None:
+        __cache = create_cache()
+
+    return __cache
+
+
+# Сбрасывает записи кэша после коммита транзакции, в которой их поменяли
+def invalidate_on_commit(session: AsyncSession, cache: CacheBackend, *keys: str) -> None:
+    on_commit(session, lambda: cache.delete(*keys))
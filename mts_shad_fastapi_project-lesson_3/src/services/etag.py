@@ -0,0 +1,70 @@
+from typing import Annotated, Iterable, Optional
+
+from fastapi import Header, Response, status
+
+__all__ = [
+    "IfMatch",
+    "IfNoneMatch",
+    "conflict",
+    "etag_matches",
+    "if_match_versions",
+    "make_etag",
+    "not_modified",
+    "rows_fingerprint",
+]
+
+# Заголовок If-None-Match из запроса клиента
+IfNoneMatch = Annotated[Optional[str], Header()]
+# Заголовок If-Match: изменить запись, только если она не менялась с момента получения ETag
+IfMatch = Annotated[Optional[str], Header()]
+
+
+# Сильный ETag из частей, однозначно задающих содержимое ответа. Например, "book-1-3".
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+# Сравнение для If-None-Match (слабое: префикс W/ не учитывается)
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+# Версии записи, перечисленные в If-Match. ETag записи начинается с "<kind>-<id>-<version>"
+# (у карточки продавца дальше идет отпечаток книг, для предусловия он не нужен: проверяем версию самой записи).
+# None - предусловия нет (заголовок не передан или "*"), пустое множество - ни один тег не подходит.
+# Сравнение сильное: слабые теги W/ для If-Match не подходят.
+def if_match_versions(header: Optional[str], kind: str, object_id: int) -> Optional[set[int]]:
+    if not header or header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        parts = tag.strip().strip('"').split("-")
+        if len(parts) >= 3 and parts[0] == kind and parts[1] == str(object_id) and parts[2].isdigit():
+            versions.add(int(parts[2]))
+    return versions
+
+
+# Ответ на конфликт параллельных изменений: 412, если клиент передал If-Match, иначе 409
+def conflict(if_match: Optional[str]) -> Response:
+    if if_match:
+        return Response(status_code=status.HTTP_412_PRECONDITION_FAILED)
+    return Response(status_code=status.HTTP_409_CONFLICT)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+# Дешевый отпечаток набора записей: количество, максимальный id и сумма версий.
+# Меняется при любом добавлении (растет max id), удалении (падает количество) и изменении (растет сумма версий).
+def rows_fingerprint(rows: Iterable) -> tuple[int, int, int]:
+    count = max_id = sum_version = 0
+    for row in rows:
+        count += 1
+        max_id = max(max_id, row.id)
+        sum_version += row.version
+    return count, max_id, sum_version
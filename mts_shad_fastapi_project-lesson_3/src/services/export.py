@@ -0,0 +1,55 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, Sequence
+
+import orjson
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.books import Book
+
+__all__ = ["EXPORT_FORMATS", "stream_books"]
+
+# Выгружаем только колонки, без ORM-объектов и связей
+EXPORT_COLUMNS = (Book.id, Book.title, Book.author, Book.year, Book.count_pages, Book.seller_id)
+
+
+def _encode_ndjson(rows: Sequence[Row]) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _encode_csv(rows: Sequence[Row]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(column.key for column in EXPORT_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+# формат -> (media type, кодировщик пачки строк)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", _encode_ndjson),
+    "csv": ("text/csv", _encode_csv),
+}
+
+
+# Читаем каталог через серверный курсор (session.stream) пачками по chunk_size строк
+# и отдаем каждую пачку сразу после сериализации. В памяти одновременно лежит только одна пачка.
+async def stream_books(
+    session_factory: Callable[[], AsyncSession], export_format: str, chunk_size: int
+) -> AsyncIterator[bytes]:
+    _, encode = EXPORT_FORMATS[export_format]
+
+    if export_format == "csv":
+        yield _csv_header()
+
+    query = select(*EXPORT_COLUMNS).order_by(Book.id).execution_options(yield_per=chunk_size)
+
+    async with session_factory() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions(chunk_size):
+            yield encode(rows)
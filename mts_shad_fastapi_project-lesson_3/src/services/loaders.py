@@ -0,0 +1,113 @@
+"""
+Загрузчики записей по ИД в рамках одного запроса (паттерн DataLoader).
+
+Код ручки просит записи по одной (await loaders.books.load(book_id)), а загрузчик собирает все ИД,
+запрошенные в одном проходе event loop, и выбирает их одним запросом WHERE id = ANY(:ids).
+Повторный запрос того же ИД в рамках запроса к БД не идет.
+"""
+
+import asyncio
+from typing import Annotated, Any, Awaitable, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import any_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from configurations.database import get_read_session
+from models.books import Book
+from models.sellers import Seller
+
+__all__ = ["DataLoader", "Loaders", "RequestLoaders", "get_loaders"]
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Колонки, из которых собираются ReturnedBook и ReturnedSeller
+BOOK_COLUMNS = (Book.id, Book.title, Book.author, Book.year, Book.count_pages, Book.seller_id)
+SELLER_COLUMNS = (Seller.id, Seller.first_name, Seller.last_name, Seller.email)
+
+
+class DataLoader(Generic[K, V]):
+    # batch_load получает список уникальных ИД и возвращает найденные записи по ИД
+    def __init__(self, batch_load: Callable[[list[K]], Awaitable[dict[K, V]]]):
+        self._batch_load = batch_load
+        self._futures: dict[K, asyncio.Future] = {}
+        self._queue: list[K] = []
+        # Цикл событий держит на задачи только слабые ссылки: без своей ссылки задачу пачки
+        # может собрать сборщик мусора, и ожидающие ее load не дождутся ответа
+        self._tasks: set[asyncio.Task] = set()
+
+    # Запись по ИД или None, если ее нет
+    def load(self, key: K) -> Awaitable[Optional[V]]:
+        if (future := self._futures.get(key)) is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = self._futures[key] = loop.create_future()
+        self._queue.append(key)
+        # Пачку отправляем, когда отработают все задачи, готовые к выполнению в этом проходе цикла:
+        # за это время они успеют добавить свои ИД
+        if len(self._queue) == 1:
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> list[Optional[V]]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._run(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # Ожидающий load может быть уже отменен (например, вместе с ручкой): такой future не трогаем
+    # и не кэшируем, следующий load того же ИД запросит его заново
+    async def _run(self, keys: list[K]) -> None:
+        try:
+            found = await self._batch_load(keys)
+        except BaseException as exc:
+            for key in keys:
+                # Ошибку не кэшируем: следующий load того же ИД попробует снова
+                future = self._futures.pop(key)
+                if future.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(exc)
+            # Отмену и системные исключения не глотаем
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for key in keys:
+            if (future := self._futures[key]).done():
+                del self._futures[key]
+            else:
+                future.set_result(found.get(key))
+
+
+# Загрузчики одного запроса. Все они работают через одну сессию, а сессия не допускает
+# параллельных запросов - поэтому пачки разных загрузчиков выполняются по очереди.
+class Loaders:
+    def __init__(self, session: AsyncSession):
+        self._session = session
+        self._lock = asyncio.Lock()
+        self.books: DataLoader[int, Any] = DataLoader(self._by_id(Book, BOOK_COLUMNS))
+        self.sellers: DataLoader[int, Any] = DataLoader(self._by_id(Seller, SELLER_COLUMNS))
+
+    def _by_id(self, model, columns) -> Callable[[list[int]], Awaitable[dict[int, Any]]]:
+        async def batch_load(ids: list[int]) -> dict[int, Any]:
+            async with self._lock:
+                res = await self._session.execute(select(*columns).where(model.id == any_(ids)))
+            return {row.id: row for row in res}
+
+        return batch_load
+
+
+# FastAPI создает зависимость один раз на запрос, поэтому все части ручки получают одни и те же загрузчики.
+# Загрузчики только читают, поэтому работают через сессию без транзакции.
+def get_loaders(session: Annotated[AsyncSession, Depends(get_read_session)]) -> Loaders:
+    return Loaders(session)
+
+
+RequestLoaders = Annotated[Loaders, Depends(get_loaders)]
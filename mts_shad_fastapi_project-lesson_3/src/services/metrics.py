@@ -0,0 +1,255 @@
+import time
+from bisect import bisect_left
+from typing import Iterator, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from configurations.settings import settings
+from services.request_context import RequestStats, current_request, get_request_stats
+from services.sql_profiling import log_slow_query
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsMiddleware",
+    "Registry",
+    "collect_cache_stats",
+    "collect_pool_stats",
+    "instrument_engine",
+    "registry",
+]
+
+# Формат text exposition, который понимает Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограмм задержки, в секундах
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# Метрики живут в памяти процесса. Приложение однопоточное (event loop), поэтому обходимся без блокировок:
+# на горячем пути - только поиск корзины и пара сложений. При нескольких воркерах uvicorn
+# каждый отдает свои значения, агрегирует их Prometheus.
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _format_labels(self, labels: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, value: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + value
+
+    # Для значений, которые копятся в другом месте (пул соединений, кэш) и переносятся в метрику при сборе
+    def set(self, *labels, value: float) -> None:
+        self._values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._format_labels(labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, value: float = 1.0) -> None:
+        self.inc(*labels, value=-value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [число наблюдений по корзинам (последняя - +Inf), сумма]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, *labels, value: float) -> None:
+        if (data := self._values.get(labels)) is None:
+            data = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else _format_value(bound)}"'
+                yield f"{self.name}_bucket{self._format_labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{self._format_labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = Registry()
+
+REQUESTS = registry.register(
+    Counter("http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+)
+REQUEST_DURATION = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+)
+REQUESTS_IN_PROGRESS = registry.register(
+    Gauge("http_requests_in_progress", "HTTP requests being processed right now", ("method",))
+)
+REQUEST_STATEMENTS = registry.register(
+    Histogram(
+        "http_request_db_statements",
+        "SQL statements executed per HTTP request",
+        ("method", "route"),
+        buckets=STATEMENT_COUNT_BUCKETS,
+    )
+)
+REQUEST_DB_DURATION = registry.register(
+    Histogram("http_request_db_duration_seconds", "Time spent in SQL per HTTP request", ("method", "route"))
+)
+STATEMENT_DURATION = registry.register(
+    Histogram("db_statement_duration_seconds", "SQL statement execution time by operation", ("operation",))
+)
+
+# Состояние пула соединений и кэша. Заполняются при каждом сборе метрик (см. /metrics)
+POOL_CONNECTIONS = registry.register(Gauge("db_pool_connections", "Connections in the pool by state", ("state",)))
+POOL_CHECKOUTS = registry.register(Counter("db_pool_checkouts_total", "Connections handed out by the pool"))
+POOL_WAIT = registry.register(Counter("db_pool_wait_seconds_total", "Total time spent waiting for a pool connection"))
+POOL_TIMEOUTS = registry.register(Counter("db_pool_timeouts_total", "Pool checkouts that timed out"))
+CACHE_OPERATIONS = registry.register(
+    Counter("cache_operations_total", "Read cache operations by result", ("backend", "result"))
+)
+
+
+# ASGI middleware (без BaseHTTPMiddleware: тот запускает ручку в отдельной задаче и заметно дороже).
+# Считает запросы в работе, время ответа и коды ответов по шаблону пути ручки,
+# и кладет в contextvar объект RequestStats, в который хуки БД пишут число и время SQL-запросов.
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats(method=method, scope=scope)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec(method)
+            route = stats.route
+            REQUESTS.inc(method, route, status_code)
+            REQUEST_DURATION.observe(method, route, value=elapsed)
+            REQUEST_STATEMENTS.observe(method, route, value=stats.statements)
+            REQUEST_DB_DURATION.observe(method, route, value=stats.db_time)
+            current_request.reset(token)
+
+
+# Время начала запроса кладем в info соединения стеком, как в рецепте профилирования из документации SQLAlchemy
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+# Здесь же пишем в лог медленные запросы (порог db_slow_query_threshold) вместе с ручкой, из которой они пришли
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper()
+    STATEMENT_DURATION.observe(operation, value=elapsed)
+    if (stats := get_request_stats()) is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+        if stats.timings is not None:
+            stats.timings.append((operation, elapsed))
+    if 0 < settings.db_slow_query_threshold <= elapsed:
+        log_slow_query(statement, parameters, elapsed, stats)
+
+
+# При ошибке запроса after_cursor_execute не вызывается - снимаем время начала со стека сами
+# (ошибки вне выполнения запроса, например при подключении, приходят без execution_context).
+# Атрибут cursor в SQLAlchemy 2.0 не заполняется, поэтому на него не смотрим.
+def _handle_error(exception_context):
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        if start_times := exception_context.connection.info.get("query_start_time"):
+            start_times.pop()
+
+
+# Подключает замер времени SQL-запросов к движку. У асинхронного движка события вешаются на sync_engine.
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+# Переносит статистику пула (см. InstrumentedQueuePool.stats) в метрики
+def collect_pool_stats(stats: dict) -> None:
+    for state in ("size", "checked_in", "checked_out", "overflow"):
+        POOL_CONNECTIONS.set(state, value=stats[state])
+    POOL_CHECKOUTS.set(value=stats["wait"]["checkouts"])
+    POOL_WAIT.set(value=stats["wait"]["total_wait"])
+    POOL_TIMEOUTS.set(value=stats["wait"]["timeouts"])
+
+
+# Переносит счетчики кэша (см. CacheBackend.stats) в метрики
+def collect_cache_stats(stats: dict) -> None:
+    for result in ("hits", "misses", "evictions", "expirations"):
+        CACHE_OPERATIONS.set(stats["backend"], result, value=stats[result])
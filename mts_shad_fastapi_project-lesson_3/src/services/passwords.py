@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from configurations.settings import settings
+
+__all__ = ["PasswordHasher", "get_password_hasher", "shutdown_password_hasher"]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data.encode(), validate=True)
+
+
+# Хеширование паролей функцией scrypt (требовательна к памяти, устойчива к перебору на GPU).
+# Один хеш занимает десятки миллисекунд CPU, поэтому считаем его в отдельном пуле потоков:
+# hashlib.scrypt отпускает GIL, и event loop продолжает обслуживать другие запросы.
+# Формат хеша: scrypt$n$r$p$соль$ключ - параметры хранятся вместе с хешем,
+# поэтому после изменения стоимости старые пароли продолжают проверяться.
+class PasswordHasher:
+    algorithm = "scrypt"
+
+    def __init__(self, n: int, r: int, p: int, workers: int, salt_size: int = 16, key_size: int = 32):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_size = salt_size
+        self.key_size = key_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, key_size: int) -> bytes:
+        # scrypt использует около 128 * n * r байт памяти, добавляем запас к лимиту OpenSSL
+        maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=key_size, maxmem=maxmem)
+
+    # Синхронные версии. Блокируют поток на время расчета, в ручках используйте hash() и verify().
+    def hash_sync(self, password: str) -> str:
+        salt = os.urandom(self.salt_size)
+        key = self._derive(password, salt, self.n, self.r, self.p, self.key_size)
+        return "$".join([self.algorithm, str(self.n), str(self.r), str(self.p), _b64encode(salt), _b64encode(key)])
+
+    # Испорченный хеш (не тот формат, не числа в параметрах, битый base64, недопустимые параметры scrypt)
+    # не совпадает ни с одним паролем: возвращаем False, а не ошибку сервера.
+    def verify_sync(self, password: str, encoded: str) -> bool:
+        try:
+            algorithm, n, r, p, salt, key = encoded.split("$")
+            if algorithm != self.algorithm:
+                return False
+            expected = _b64decode(key)
+            actual = self._derive(password, _b64decode(salt), int(n), int(r), int(p), len(expected))
+        except ValueError:  # binascii.Error от base64 - подкласс ValueError
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    # Нужно ли пересчитать хеш с текущими параметрами стоимости
+    def needs_rehash(self, encoded: str) -> bool:
+        return not encoded.startswith(f"{self.algorithm}${self.n}${self.r}${self.p}$")
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.hash_sync, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.verify_sync, password, encoded)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+__password_hasher: Optional[PasswordHasher] = None
+
+
+# Зависимость для ручек. Пул потоков создается один раз на процесс.
+def get_password_hasher() -> PasswordHasher:
+    global __password_hasher
+
+    if __password_hasher is None:
+        __password_hasher = PasswordHasher(
+            n=settings.password_hash_n,
+            r=settings.password_hash_r,
+            p=settings.password_hash_p,
+            workers=settings.password_hash_workers,
+        )
+
+    return __password_hasher
+
+
+# Останавливает пул потоков хешера при остановке приложения (вызывается из lifespan)
+def shutdown_password_hasher() -> None:
+    global __password_hasher
+
+    if __password_hasher is not None:
+        __password_hasher.shutdown()
+        __password_hasher = None
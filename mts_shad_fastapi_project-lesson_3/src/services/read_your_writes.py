@@ -0,0 +1,43 @@
+import time
+from http.cookies import SimpleCookie
+
+from configurations.replicas import READ_YOUR_WRITES_COOKIE
+from configurations.settings import settings
+
+__all__ = ["ReadYourWritesMiddleware"]
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+# Реплика отстает от основной БД, поэтому клиент мог бы не увидеть только что сделанную запись.
+# После успешного изменяющего запроса выдаем клиенту cookie с моментом, до которого его чтения
+# идут в основную БД (см. get_read_session). Без реплик cookie не нужна и не выставляется.
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    # Cookie нужна только после изменяющих HTTP-запросов и только когда настроены реплики
+    @staticmethod
+    def _applies(scope) -> bool:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return False
+        return bool(settings.db_replica_urls) and settings.read_your_writes_window > 0
+
+    async def __call__(self, scope, receive, send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[READ_YOUR_WRITES_COOKIE] = f"{time.time() + settings.read_your_writes_window:.3f}"
+                cookie[READ_YOUR_WRITES_COOKIE]["max-age"] = int(settings.read_your_writes_window) + 1
+                cookie[READ_YOUR_WRITES_COOKIE]["path"] = "/"
+                cookie[READ_YOUR_WRITES_COOKIE]["httponly"] = True
+                cookie[READ_YOUR_WRITES_COOKIE]["samesite"] = "lax"
+                header = (b"set-cookie", cookie.output(header="").strip().encode("latin-1"))
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,71 @@
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+__all__ = ["RequestIdMiddleware", "RequestStats", "current_request", "get_request_id", "get_request_stats"]
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+
+# Данные текущего запроса, которые нужны глубоко в коде (например, в событиях движка БД),
+# куда их нельзя передать аргументом. Объект изменяемый: его заполняют и middleware, и хуки БД.
+@dataclass
+class RequestStats:
+    method: str
+    scope: dict[str, Any] = field(repr=False)
+    statements: int = 0  # сколько SQL-запросов выполнено за запрос
+    db_time: float = 0.0  # сколько секунд они заняли суммарно
+    timings: Optional[list[tuple[str, float]]] = None  # (тип, время) каждого запроса, если включено профилирование
+
+    # Шаблон пути ручки, например /api/v1/books/{book_id}. Роутер FastAPI кладет ручку в scope
+    # при сопоставлении пути, поэтому до этого момента (и для неизвестных путей) route = "unmatched".
+    # Используем шаблон, а не сам путь, чтобы число меток в метриках не зависело от id в URL.
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return route.path if route is not None else "unmatched"
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+# None - если код выполняется вне HTTP-запроса (фоновые задачи, тесты, миграции)
+def get_request_stats() -> Optional[RequestStats]:
+    return current_request.get()
+
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    return request_id.get()
+
+
+# Id запроса для сквозного поиска по логам. Берем из заголовка X-Request-ID (его ставит балансировщик
+# или вызывающий сервис), если его нет или он подозрительный - генерируем. Возвращаем в ответе.
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = next((value for name, value in scope["headers"] if name == REQUEST_ID_HEADER), b"").decode("latin-1")
+        if not value or len(value) > MAX_REQUEST_ID_LENGTH or not (value.isascii() and value.isprintable()):
+            value = uuid.uuid4().hex
+        token = request_id.set(value)
+        header = (REQUEST_ID_HEADER, value.encode())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,62 @@
+from typing import Annotated, Optional
+
+from fastapi import Query
+from sqlalchemy import Select
+
+from models.books import Book, search_query, search_vector
+
+__all__ = ["BookFilters", "build_search_query"]
+
+
+# Экранируем спецсимволы LIKE, чтобы "%" и "_" в запросе искались как обычные символы
+LIKE_ESCAPE = "/"
+
+
+def _escape_like(value: str) -> str:
+    return value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+
+
+# Параметры поиска книг. Все фильтры необязательные и объединяются через И.
+class BookFilters:
+    def __init__(
+        self,
+        title: Annotated[Optional[str], Query(min_length=1, description="Начало названия, без учета регистра")] = None,
+        author: Annotated[
+            Optional[str], Query(min_length=1, description="Начало имени автора, без учета регистра")
+        ] = None,
+        q: Annotated[
+            Optional[str], Query(min_length=1, description="Полнотекстовый поиск по названию и автору")
+        ] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        seller_id: Optional[int] = None,
+    ):
+        self.title = title
+        self.author = author
+        self.q = q
+        self.year_from = year_from
+        self.year_to = year_to
+        self.seller_id = seller_id
+
+
+# Добавляет условия поиска к запросу. Для каждого условия есть индекс в books_table:
+# префиксы - триграммные GIN, полнотекстовый поиск - GIN по tsvector, годы и продавец - btree.
+def build_search_query(query: Select, filters: BookFilters) -> Select:
+    if filters.title:
+        query = query.where(Book.title.ilike(_escape_like(filters.title) + "%", escape=LIKE_ESCAPE))
+    if filters.author:
+        query = query.where(Book.author.ilike(_escape_like(filters.author) + "%", escape=LIKE_ESCAPE))
+    if filters.q:
+        query = query.where(search_vector(Book.title, Book.author).op("@@")(search_query(filters.q)))
+    if filters.year_from is not None and filters.year_from == filters.year_to:
+        # Один год - равенство: индексы (year, id) и (seller_id, year, id) отдают строки сразу в порядке ИД.
+        # Для диапазона "year >= x AND year <= x" Postgres этого не видит и идет по первичному ключу с фильтром.
+        query = query.where(Book.year == filters.year_from)
+    else:
+        if filters.year_from is not None:
+            query = query.where(Book.year >= filters.year_from)
+        if filters.year_to is not None:
+            query = query.where(Book.year <= filters.year_to)
+    if filters.seller_id is not None:
+        query = query.where(Book.seller_id == filters.seller_id)
+    return query
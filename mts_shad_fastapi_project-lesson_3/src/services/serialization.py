@@ -0,0 +1,29 @@
+"""
+Быстрый путь ответа для списков.
+
+Обычно FastAPI проверяет каждый объект ответа по response_model (для страницы из тысяч книг -
+тысячи вызовов валидации pydantic) и только потом отдает результат в ORJSONResponse.
+Данные из БД проверять незачем: типы колонок гарантирует схема таблицы. Поэтому ручки списков
+выбирают из БД только колонки схемы ответа, собирают из строк словари и сразу отдают их orjson.
+Ручка, которая возвращает Response, минует валидацию, а response_model в декораторе
+по-прежнему описывает ответ в OpenAPI.
+"""
+
+from typing import Iterable
+
+from pydantic import BaseModel
+from sqlalchemy import Row
+
+__all__ = ["rows_as_dicts", "schema_columns"]
+
+
+# Колонки модели БД в порядке полей схемы ответа. Такой же порядок ключей дает и валидация через схему.
+def schema_columns(model, schema: type[BaseModel]) -> tuple:
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+# Строки, выбранные по schema_columns, в словари с полями схемы.
+# Колонки после полей схемы (например, version для ETag) в ответ не попадают.
+def rows_as_dicts(rows: Iterable[Row], schema: type[BaseModel]) -> list[dict]:
+    keys = tuple(schema.model_fields)
+    return [dict(zip(keys, row)) for row in rows]
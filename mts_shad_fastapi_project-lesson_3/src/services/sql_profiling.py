@@ -0,0 +1,100 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+from configurations.settings import settings
+from services.request_context import RequestStats, get_request_stats
+
+__all__ = ["PROFILE_HEADER", "ProfilingMiddleware", "log_slow_query", "redact_parameters", "server_timing"]
+
+logger = logging.getLogger(__name__)
+
+# Заголовок запроса, включающий профилирование SQL для этого запроса
+PROFILE_HEADER = "X-Profile-SQL"
+MAX_LOGGED_STATEMENT = 2000  # длинные запросы (например, массовая вставка) обрезаем в логе
+
+
+# Значения параметров в лог не пишем: там могут быть пароли, email и прочие персональные данные.
+# Оставляем только тип и длину, этого достаточно, чтобы понять форму запроса.
+def redact_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        # executemany: список наборов параметров, показываем первый и их количество
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def _redact_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def log_slow_query(statement: str, parameters: Any, elapsed: float, stats: Optional[RequestStats]) -> None:
+    route = f"{stats.method} {stats.route}" if stats is not None else "-"
+    if len(statement) > MAX_LOGGED_STATEMENT:
+        statement = statement[:MAX_LOGGED_STATEMENT] + "..."
+    logger.warning(
+        "Slow query %.1f ms on %s: %s; parameters: %s",
+        elapsed * 1000,
+        route,
+        statement,
+        redact_parameters(parameters),
+        extra={"duration_ms": round(elapsed * 1000, 3), "route": route},
+    )
+
+
+# Сводка по SQL-запросам в формате Server-Timing: общее время в БД и разбивка по типам запросов.
+# Браузер показывает ее на вкладке Network, curl - в заголовках ответа.
+def server_timing(stats: RequestStats, total: float) -> str:
+    by_operation: dict[str, list[float]] = defaultdict(list)
+    for operation, elapsed in stats.timings or ():
+        by_operation[operation].append(elapsed)
+
+    metrics = [
+        f'app;dur={total * 1000:.2f};desc="total"',
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} statements"',
+    ]
+    for operation, timings in by_operation.items():
+        metrics.append(f'db-{operation.lower()};dur={sum(timings) * 1000:.2f};desc="{len(timings)} {operation}"')
+    return ", ".join(metrics)
+
+
+# Профилирование отдельного запроса по заголовку X-Profile-SQL: 1.
+# В ответ добавляются Server-Timing и X-SQL-Statements - удобно искать N+1 прямо в проде.
+# Текст запросов и параметры клиенту не отдаются, только число и время.
+# Должен стоять внутри MetricsMiddleware: тот создает RequestStats, куда хуки БД пишут время запросов.
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.header = PROFILE_HEADER.lower().encode()
+
+    # Профилирование запрошено заголовком и разрешено настройками
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http" or not settings.sql_profiling_enabled:
+            return False
+        return any(name == self.header and value not in (b"", b"0") for name, value in scope["headers"])
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope) or (stats := get_request_stats()) is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats.timings = []
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                headers.append((b"x-sql-statements", str(stats.statements).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import configurations.database as database
+from benchmarks.api import compare_results, percentile, seed, summarize, use_benchmark_database
+from configurations.settings import settings
+
+
+# Перцентили и сводка по задержкам бенчмарка
+def test_summarize():
+    latencies = [i / 1000 for i in range(1, 101)]  # 1..100 мс
+    stats = summarize(latencies, elapsed=2.0, errors=3)
+
+    assert stats["requests"] == 100
+    assert stats["errors"] == 3
+    assert stats["rps"] == 50
+    assert stats["p50_ms"] == percentile([i for i in range(1, 101)], 50) == 50
+    assert round(stats["p95_ms"]) == 95
+    assert round(stats["p99_ms"]) == 99
+    assert round(stats["max_ms"]) == 100
+    assert percentile([], 99) == 0.0
+
+
+# Регрессией считается рост p95 или падение RPS больше порога, а также новые ошибки
+def test_compare_results():
+    def stats(p95_ms, rps, errors=0):
+        return {"p95_ms": p95_ms, "rps": rps, "errors": errors}
+
+    base = {"scenarios": {"a": stats(10, 100), "b": stats(10, 100), "c": stats(10, 100), "d": stats(10, 100)}}
+    new = {
+        "scenarios": {
+            "a": stats(10.5, 98),
+            "b": stats(12, 100),
+            "c": stats(10, 80),
+            "d": stats(10, 100, 1),
+            "e": stats(1, 1),
+        }
+    }
+
+    rows = {row["name"]: row for row in compare_results(base, new, threshold=10)}
+    assert rows.keys() == {"a", "b", "c", "d"}
+    assert not rows["a"]["regression"]
+    assert rows["b"]["regression"]
+    assert rows["c"]["regression"]
+    assert rows["d"]["regression"]
+
+
+# Бенчмарк не трогает основную базу: без отдельной DB_BENCHMARK_NAME он отказывается запускаться,
+# а с ней переключает на нее и приложение, и дочерние процессы сервера
+@pytest.mark.asyncio
+async def test_benchmark_database(monkeypatch):
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", database.SQLALCHEMY_DATABASE_URL)
+    monkeypatch.setenv("DB_NAME", settings.db_name)  # use_benchmark_database меняет окружение процесса
+    for name in ("", settings.db_name, settings.db_test_name):
+        monkeypatch.setattr(settings, "db_benchmark_name", name)
+        with pytest.raises(SystemExit):
+            use_benchmark_database()
+        with pytest.raises(SystemExit):
+            await seed(1, 1)
+
+    monkeypatch.setattr(settings, "db_benchmark_name", "books_benchmark")
+    assert use_benchmark_database() == f"{settings.db_host}/books_benchmark"
+    assert database.SQLALCHEMY_DATABASE_URL == f"{settings.db_host}/books_benchmark"
+    assert os.environ["DB_NAME"] == "books_benchmark"
@@ -2,12 +2,16 @@ import pytest
 import orjson
 
 from fastapi import status
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from src.models import sellers
 from src.models import books
 
 from configurations.database import global_init, delete_db_and_tables
+from schemas import ReturnedAllBooks
+from schemas.sellers import ReturnedAllSellers
+from services.cache import get_cache
+from services.passwords import get_password_hasher
 
 
 # Тест на ручку создающую книгу
@@ -36,6 +40,52 @@ async def test_create_book(db_session, async_client):
 
 
 
+# Тест на ручку массового создания книг
+@pytest.mark.asyncio
+async def test_create_books_bulk(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.commit()
+
+    data = [
+        {"title": "Eugeny Onegin", "author": "Pushkin", "count_pages": 104, "year": 2001, "seller_id": seller.id},
+        {"title": "Mziri", "author": "Lermontov", "count_pages": 90, "year": 1997, "seller_id": seller.id},
+    ]
+    response = await async_client.post("/api/v1/books/bulk", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    result = response.json()["books"]
+    assert [{k: v for k, v in book.items() if k != "id"} for book in result] == data
+    assert result[0]["id"] < result[1]["id"]
+
+    # Ошибки возвращаются по каждому элементу, и ничего не сохраняется
+    data = [
+        {"title": "Viy", "author": "Gogol", "count_pages": 104, "year": 1999, "seller_id": seller.id},
+        {"title": "Old", "author": "Nobody", "count_pages": 10, "year": 1800, "seller_id": seller.id},
+        {"title": "Lost", "author": "Nobody", "count_pages": 10, "year": 2000, "seller_id": 100500},
+    ]
+    response = await async_client.post("/api/v1/books/bulk", json=data)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [item["index"] for item in response.json()["detail"]] == [1, 2]
+    assert response.json()["detail"][0]["errors"][0]["loc"] == ["year"]
+    assert response.json()["detail"][1]["errors"][0]["loc"] == ["seller_id"]
+
+    all_books = await db_session.execute(select(books.Book))
+    assert len(all_books.scalars().all()) == 2
+
+    # Элемент, который вовсе не объект, - тоже ошибка своего элемента, а не всего запроса
+    response = await async_client.post("/api/v1/books/bulk", json=[data[0], "Viy"])
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert [item["index"] for item in response.json()["detail"]] == [1]
+
+    # Схема тела в OpenAPI - массив IncomingBook
+    openapi = (await async_client.get("/openapi.json")).json()
+    schema = openapi["paths"]["/api/v1/books/bulk"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert schema["items"] == {"$ref": "#/components/schemas/IncomingBook"}
+
+
 # Тест на ручку получения списка книг
 @pytest.mark.asyncio
 async def test_get_books(db_session, async_client):
@@ -64,10 +114,106 @@ async def test_get_books(db_session, async_client):
         "books": [
             {"title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "id": book.id, "count_pages": 104, "seller_id": 1},
             {"title": "Mziri", "author": "Lermontov", "year": 1997, "id": book_2.id, "count_pages": 104, "seller_id": 1}
-        ]
+        ],
+        "next_cursor": None
     }
 
 
+# Тест на постраничную выдачу списка книг
+@pytest.mark.asyncio
+async def test_get_books_paginated(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+    book_3 = books.Book(author="Gogol", title="Viy", year=1999, count_pages=104, seller_id=seller.id)
+
+    db_session.add_all([book, book_2, book_3])
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/books/", params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert [b["id"] for b in response.json()["books"]] == [book.id, book_2.id]
+    assert response.json()["next_cursor"] == book_2.id
+
+    response = await async_client.get("/api/v1/books/", params={"limit": 2, "after": book_2.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert [b["id"] for b in response.json()["books"]] == [book_3.id]
+    assert response.json()["next_cursor"] is None
+
+    # Размер страницы ограничен сверху
+    response = await async_client.get("/api/v1/books/", params={"limit": 10**6})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+# Списки отдаются без валидации по схеме ответа, но байт в байт так же, как отдала бы валидация,
+# а схема ответа по-прежнему описана в OpenAPI
+@pytest.mark.asyncio
+async def test_list_fast_path_matches_schema(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            books.Book(author=f"Author {i}", title=f"Title {i}", year=2000 + i, count_pages=i, seller_id=seller.id)
+            for i in range(3)
+        ]
+    )
+    await db_session.commit()
+
+    for path, schema in (("/api/v1/books/", ReturnedAllBooks), ("/api/v1/sellers/", ReturnedAllSellers)):
+        response = await async_client.get(path, params={"limit": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == orjson.dumps(schema.model_validate(response.json()).model_dump())
+        assert response.headers["etag"]
+
+    response = await async_client.get("/api/v1/books/search", params={"author": "Author"})
+    assert response.content == orjson.dumps(ReturnedAllBooks.model_validate(response.json()).model_dump())
+
+    openapi = (await async_client.get("/openapi.json")).json()
+    for path, schema in (("/api/v1/books/", ReturnedAllBooks), ("/api/v1/sellers/", ReturnedAllSellers)):
+        content = openapi["paths"][path]["get"]["responses"]["200"]["content"]["application/json"]
+        assert content["schema"] == {"$ref": f"#/components/schemas/{schema.__name__}"}
+
+
+# Тест на потоковую выгрузку каталога
+@pytest.mark.asyncio
+async def test_export_books(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+
+    db_session.add_all([book, book_2])
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/books/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [orjson.loads(line) for line in response.text.splitlines()] == [
+        {"id": book.id, "title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "count_pages": 104, "seller_id": seller.id},
+        {"id": book_2.id, "title": "Mziri", "author": "Lermontov", "year": 1997, "count_pages": 104, "seller_id": seller.id},
+    ]
+
+    response = await async_client.get("/api/v1/books/export", params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.splitlines() == [
+        "id,title,author,year,count_pages,seller_id",
+        f"{book.id},Eugeny Onegin,Pushkin,2001,104,{seller.id}",
+        f"{book_2.id},Mziri,Lermontov,1997,104,{seller.id}",
+    ]
+
+
 #Тест на ручку получения одной книги
 @pytest.mark.asyncio
 async def test_get_single_book(db_session, async_client):
@@ -104,6 +250,45 @@ async def test_get_single_book(db_session, async_client):
     }
 
 
+# Тест на ручку получения книг по списку ИД
+@pytest.mark.asyncio
+async def test_get_books_batch(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+    db_session.add_all([book, book_2])
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/books/batch", params={"ids": [book_2.id, 100500, book.id, book_2.id]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "books": [
+            {"title": "Mziri", "author": "Lermontov", "year": 1997, "count_pages": 104, "seller_id": seller.id, "id": book_2.id},
+            {"title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "count_pages": 104, "seller_id": seller.id, "id": book.id},
+        ],
+        "missing": [100500],
+    }
+
+    response = await async_client.get("/api/v1/sellers/batch", params={"ids": [seller.id, 100500]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "sellers": [{"first_name": "Alexander", "last_name": "Boytsov", "email": "AlexanderBoytsov@mail.ru", "id": seller.id}],
+        "missing": [100500],
+    }
+
+    response = await async_client.get("/api/v1/books/batch")
+    assert response.json() == {"books": [], "missing": []}
+    response = await async_client.get("/api/v1/books/batch", params={"ids": ["abc"]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.get("/api/v1/books/batch", params={"ids": list(range(1, 1002))})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 # Тест на ручку удаления книги
 @pytest.mark.asyncio
 async def test_delete_book(db_session, async_client):
@@ -134,6 +319,37 @@ async def test_delete_book(db_session, async_client):
     assert len(res) == 0
 
 
+# Тест на ручку массового удаления книг
+@pytest.mark.asyncio
+async def test_delete_books_bulk(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+    book_3 = books.Book(author="Gogol", title="Viy", year=1999, count_pages=104, seller_id=seller.id)
+    db_session.add_all([book, book_2, book_3])
+    await db_session.commit()
+
+    # Карточка продавца в кэше должна сброситься
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+
+    response = await async_client.request("DELETE", "/api/v1/books/bulk", json=[book_3.id, book.id, 100500])
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted": [book.id, book_3.id]}
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert [b["title"] for b in response.json()["books"]] == ["Mziri"]
+
+    response = await async_client.request("DELETE", "/api/v1/books/bulk", json=[])
+    assert response.json() == {"deleted": []}
+    response = await async_client.request("DELETE", "/api/v1/books/bulk", json=["abc"])
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 # Тест на ручку обновления книги
 @pytest.mark.asyncio
 async def test_update_book(db_session, async_client):
@@ -173,7 +389,65 @@ async def test_update_book(db_session, async_client):
 
 
 
+# Тест на ручку частичного обновления книги
+@pytest.mark.asyncio
+async def test_patch_book(db_session, async_client):
+    global_init()
 
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    seller_2 = sellers.Seller(first_name="Ilya", last_name="Neustroev", email="IlyaNeustroev@mail.ru", password="12345678")
+    db_session.add_all([seller, seller_2])
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    # Прогреваем кэш карточек, чтобы проверить их сброс
+    etag = (await async_client.get(f"/api/v1/books/{book.id}")).headers["etag"]
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={"title": "Mziri"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "title": "Mziri", "author": "Pushkin", "year": 2001, "count_pages": 104, "seller_id": seller.id, "id": book.id
+    }
+    assert response.headers["etag"] != etag
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Mziri"
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert response.json()["books"][0]["title"] == "Mziri"
+
+    # Переход к другому продавцу сбрасывает карточки обоих
+    await async_client.get(f"/api/v1/sellers/{seller_2.id}")
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={"seller_id": seller_2.id, "year": 2007})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["seller_id"] == seller_2.id
+    assert response.json()["year"] == 2007
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert response.json()["books"] == []
+    response = await async_client.get(f"/api/v1/sellers/{seller_2.id}")
+    assert [b["title"] for b in response.json()["books"]] == ["Mziri"]
+
+    # Пустое изменение ничего не меняет
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["title"] == "Mziri"
+
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={"title": None})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={"year": 1800})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.patch(f"/api/v1/books/{book.id}", json={"seller_id": 100500})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["loc"] == ["body", "seller_id"]
+
+    response = await async_client.patch("/api/v1/books/100500", json={"title": "Viy"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.patch("/api/v1/books/100500", json={})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
 # Тест на ручку создающую продавца
@@ -210,9 +484,17 @@ async def test_get_sellers(db_session, async_client):
         "sellers": [
             {"first_name": "Alexander", "last_name": "Boytsov", "email": "AlexanderBoytsov@mail.ru", "id": 1},
             {"first_name": "Ilya", "last_name": "Neustroev", "email": "IlyaNeustroev@mail.ru", "id": 2}
-        ]
+        ],
+        "next_cursor": None
     }
 
+    response = await async_client.get("/api/v1/sellers/", params={"limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sellers"] == [
+        {"first_name": "Alexander", "last_name": "Boytsov", "email": "AlexanderBoytsov@mail.ru", "id": 1}
+    ]
+    assert response.json()["next_cursor"] == 1
+
 
 #Тест на ручку получения одного продавца
 @pytest.mark.asyncio
@@ -237,24 +519,43 @@ async def test_get_single_seller(db_session, async_client):
     }
 
 
-# Тест на ручку удаления продавца
+# Тест на ручку удаления продавца: вместе с ним удаляются его книги
 @pytest.mark.asyncio
 async def test_delete_seller(db_session, async_client):
     global_init()
 
     seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    seller_2 = sellers.Seller(first_name="Ilya", last_name="Neustroev", email="IlyaNeustroev@mail.ru", password="12345678")
 
-    db_session.add_all([seller])
+    db_session.add_all([seller, seller_2])
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller_2.id)
+    db_session.add_all([book, book_2])
     await db_session.commit()
 
+    # Книга в кэше не должна пережить удаление продавца
+    await async_client.get(f"/api/v1/books/{book.id}")
+
     response = await async_client.delete(f"/api/v1/sellers/{seller.id}")
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
     await db_session.flush()
 
-    all_sellers = await db_session.execute(select(sellers.Seller))
-    res = all_sellers.scalars().all()
-    assert len(res) == 0
+    all_sellers = await db_session.execute(select(sellers.Seller.id))
+    assert all_sellers.scalars().all() == [seller_2.id]
+    all_books = await db_session.execute(select(books.Book.id))
+    assert all_books.scalars().all() == [book_2.id]
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # Продавец без книг и несуществующий продавец
+    response = await async_client.delete(f"/api/v1/sellers/{seller_2.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = await async_client.delete("/api/v1/sellers/100500")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
 # Тест на ручку обновления продавца
@@ -273,6 +574,15 @@ async def test_update_seller(db_session, async_client):
     )
     
     assert response.status_code == status.HTTP_200_OK
+    # Хеш пароля и служебная версия в ответ не попадают, ETag остается в заголовке
+    assert response.json() == {
+        "first_name": "Ilya",
+        "last_name": "Neustroev",
+        "email": "IlyaNeustroev@mail.ru",
+        "id": seller.id,
+    }
+    assert "password" not in response.json()
+    assert response.headers["etag"]
     await db_session.commit()
     
     res = await async_client.get(f"/api/v1/sellers/{seller.id}")    
@@ -280,4 +590,244 @@ async def test_update_seller(db_session, async_client):
     assert res.json()["last_name"] == "Neustroev"
     assert res.json()["email"] == "IlyaNeustroev@mail.ru"
     assert res.json()["id"] == seller.id
-    
\ No newline at end of file
+
+
+# Тест на ручку частичного обновления продавца
+@pytest.mark.asyncio
+async def test_patch_seller(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.commit()
+
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+
+    response = await async_client.patch(f"/api/v1/sellers/{seller.id}", json={"email": "Boytsov@mail.ru"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "first_name": "Alexander", "last_name": "Boytsov", "email": "Boytsov@mail.ru", "id": seller.id
+    }
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert response.json()["email"] == "Boytsov@mail.ru"
+
+    # Новый пароль сохраняется в виде хеша
+    response = await async_client.patch(f"/api/v1/sellers/{seller.id}", json={"password": "87654321"})
+    assert response.status_code == status.HTTP_200_OK
+    res = await db_session.execute(select(sellers.Seller.password, sellers.Seller.version).where(sellers.Seller.id == seller.id))
+    password, version = res.one()
+    assert await get_password_hasher().verify("87654321", password)
+    assert version == 3
+
+    response = await async_client.patch(f"/api/v1/sellers/{seller.id}", json={"password": "short"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await async_client.patch("/api/v1/sellers/100500", json={"first_name": "Ilya"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# Тест на кэширование карточек книги и продавца и их сброс при изменении
+@pytest.mark.asyncio
+async def test_read_cache_invalidation(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    stats = (await async_client.get("/internal/cache")).json()
+
+    await async_client.get(f"/api/v1/books/{book.id}")
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+    await async_client.get(f"/api/v1/books/{book.id}")
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+
+    new_stats = (await async_client.get("/internal/cache")).json()
+    assert new_stats["misses"] - stats["misses"] == 2
+    assert new_stats["hits"] - stats["hits"] == 2
+
+    # Изменение книги сбрасывает и ее карточку, и карточку продавца
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "count_pages": 100, "year": 2007, "id": book.id, "seller_id": seller.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.json()["title"] == "Mziri"
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert response.json()["books"][0]["title"] == "Mziri"
+
+    # Новая книга появляется в карточке продавца
+    data = {"title": "Viy", "author": "Gogol", "count_pages": 104, "year": 1999, "seller_id": seller.id}
+    response = await async_client.post("/api/v1/books/", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert [b["title"] for b in response.json()["books"]] == ["Mziri", "Viy"]
+
+    # Удаленная книга не отдается из кэша
+    response = await async_client.delete(f"/api/v1/books/{book.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await async_client.get(f"/api/v1/books/{book.id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# Тест на условные запросы: ETag и If-None-Match
+@pytest.mark.asyncio
+async def test_conditional_get(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    urls = [f"/api/v1/books/{book.id}", f"/api/v1/sellers/{seller.id}", "/api/v1/books/", "/api/v1/sellers/"]
+    etags = {}
+    for url in urls:
+        response = await async_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        etags[url] = response.headers["etag"]
+
+        # Данные не менялись - тело не отдаем
+        response = await async_client.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etags[url]
+        assert response.content == b""
+
+    response = await async_client.put(
+        f"/api/v1/books/{book.id}",
+        json={"title": "Mziri", "author": "Lermontov", "count_pages": 100, "year": 2007, "id": book.id, "seller_id": seller.id},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    # После изменения книги меняются ETag книги, продавца и списка книг
+    for url in [f"/api/v1/books/{book.id}", f"/api/v1/sellers/{seller.id}", "/api/v1/books/"]:
+        response = await async_client.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etags[url]
+
+    response = await async_client.get("/api/v1/sellers/", headers={"If-None-Match": etags["/api/v1/sellers/"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+# ETag карточки продавца различает наборы книг с одинаковыми количеством, max id и суммой версий
+@pytest.mark.asyncio
+async def test_seller_card_etag_fingerprint(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+    db_session.add_all([book, book_2])
+    await db_session.flush()
+    await db_session.execute(update(books.Book).where(books.Book.id == book_2.id).values(version=2))
+    await db_session.commit()
+
+    url = f"/api/v1/sellers/{seller.id}"
+    etag = (await async_client.get(url)).headers["etag"]
+
+    # Версии книг поменялись местами: сумма версий та же, а содержимое карточки другое
+    await db_session.execute(update(books.Book).where(books.Book.id == book.id).values(title="Viy", version=2))
+    await db_session.execute(update(books.Book).where(books.Book.id == book_2.id).values(version=1))
+    await db_session.commit()
+    await get_cache().clear()
+
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["books"][0]["title"] == "Viy"
+    assert response.headers["etag"] != etag
+
+
+# Тест на условные изменения: If-Match на PUT, PATCH и DELETE
+@pytest.mark.asyncio
+async def test_if_match(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    url = f"/api/v1/books/{book.id}"
+    stale_etag = (await async_client.get(url)).headers["etag"]
+
+    response = await async_client.patch(url, json={"title": "Mziri"}, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["etag"]
+
+    # Книгу изменили после получения ETag - изменение и удаление отклоняются
+    response = await async_client.patch(url, json={"title": "Viy"}, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    data = {"title": "Viy", "author": "Gogol", "count_pages": 100, "year": 2007, "id": book.id, "seller_id": seller.id}
+    response = await async_client.put(url, json=data, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.delete(url, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    # Слабый ETag для If-Match не подходит
+    response = await async_client.patch(url, json={"title": "Viy"}, headers={"If-Match": f"W/{etag}"})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    response = await async_client.get(url)
+    assert response.json()["title"] == "Mziri"
+    assert response.headers["etag"] == etag
+
+    response = await async_client.put(url, json=data, headers={"If-Match": f'"other", {etag}'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] != etag
+    etag = response.headers["etag"]
+
+    # Условный запрос к несуществующей книге - предусловие не выполнено, а без If-Match - обычные 404 и 204
+    missing = "/api/v1/books/100500"
+    for if_match in (etag, "*"):
+        response = await async_client.patch(missing, json={"title": "Viy"}, headers={"If-Match": if_match})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        response = await async_client.patch(missing, json={}, headers={"If-Match": if_match})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        response = await async_client.put(missing, json=data, headers={"If-Match": if_match})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        response = await async_client.delete(missing, headers={"If-Match": if_match})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.patch(missing, json={"title": "Viy"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.delete(missing)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = await async_client.delete(url, headers={"If-Match": etag})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    # Для продавца подходит ETag его карточки: сравнивается версия самого продавца
+    url = f"/api/v1/sellers/{seller.id}"
+    stale_etag = (await async_client.get(url)).headers["etag"]
+    response = await async_client.patch(url, json={"first_name": "Ilya"}, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_200_OK
+    response = await async_client.patch(url, json={"first_name": "Fedor"}, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.delete(url, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.delete(url, headers={"If-Match": (await async_client.get(url)).headers["etag"]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    # Продавца больше нет: условные запросы к нему - 412
+    seller_data = {"first_name": "Ilya", "last_name": "Neustroev", "email": "Ilya@mail.ru", "password": "0" * 8}
+    response = await async_client.put(url, json=seller_data, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.patch(url, json={"first_name": "Fedor"}, headers={"If-Match": "*"})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = await async_client.delete(url, headers={"If-Match": stale_etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
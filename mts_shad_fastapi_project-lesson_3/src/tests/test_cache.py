@@ -0,0 +1,33 @@
+import pytest
+
+from services.cache import MemoryCache
+
+
+# Тест на вытеснение давно не использованных записей
+@pytest.mark.asyncio
+async def test_memory_cache_lru():
+    cache = MemoryCache(ttl=60, max_entries=2)
+
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    assert await cache.get("a") == 1  # "a" становится самой свежей записью
+    await cache.set("c", 3)  # вытесняет "b"
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert await cache.get("c") == 3
+    assert cache.stats() == {"backend": "memory", "hits": 3, "misses": 1, "evictions": 1, "expirations": 0, "size": 2}
+
+
+# Тест на истечение времени жизни записи
+@pytest.mark.asyncio
+async def test_memory_cache_ttl():
+    cache = MemoryCache(ttl=-1, max_entries=10)
+
+    await cache.set("a", 1)
+    assert await cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+    await cache.set("b", 2)
+    await cache.delete("b")
+    assert await cache.get("b") is None
@@ -0,0 +1,102 @@
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from configurations.database import get_async_session, get_read_session, run_after_commit
+from models.books import Book
+from models.sellers import Seller
+from tests.conftest import TEST_DATABASE_URL
+
+WRITERS = 50
+
+
+# Для проверки гонок ручкам нужны настоящие параллельные транзакции, а не одно соединение теста.
+# Поэтому здесь свой движок с пулом, сессии коммитят по-настоящему, а записи удаляются в конце теста.
+@pytest_asyncio.fixture(scope="function")
+async def committing_client():
+    from main import app
+
+    engine = create_async_engine(TEST_DATABASE_URL, pool_size=20, max_overflow=0)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+    read_session_factory = async_sessionmaker(engine.execution_options(isolation_level="AUTOCOMMIT"))
+
+    async def _get_async_session():
+        async with session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+                await run_after_commit(session)
+            except Exception:
+                await session.rollback()
+                raise
+
+    async def _get_read_session():
+        async with read_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = _get_async_session
+    app.dependency_overrides[get_read_session] = _get_read_session
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://127.0.0.1:8000", timeout=60) as client:
+            yield client, session_factory
+    finally:
+        app.dependency_overrides.clear()
+        async with engine.begin() as connection:
+            await connection.execute(delete(Book))
+            await connection.execute(delete(Seller))
+        await engine.dispose()
+
+
+# Каждый писатель читает книгу, увеличивает число страниц на 1 и пишет с If-Match.
+# При 412 перечитывает и повторяет. Если бы последний писатель молча затирал чужие изменения,
+# итоговое число страниц оказалось бы меньше числа писателей.
+@pytest.mark.asyncio
+async def test_no_lost_updates(committing_client):
+    client, session_factory = committing_client
+
+    async with session_factory() as session:
+        seller = Seller(
+            first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000"
+        )
+        session.add(seller)
+        await session.flush()
+        book = Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=0, seller_id=seller.id)
+        session.add(book)
+        await session.commit()
+
+    url = f"/api/v1/books/{book.id}"
+    conflicts = 0
+
+    async def writer(n: int) -> None:
+        nonlocal conflicts
+        while True:
+            response = await client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            current, etag = response.json(), response.headers["etag"]
+            # Половина писателей обновляет книгу целиком, половина - частично
+            count_pages = current["count_pages"] + 1
+            if n % 2:
+                response = await client.put(
+                    url, json={**current, "count_pages": count_pages}, headers={"If-Match": etag}
+                )
+            else:
+                response = await client.patch(url, json={"count_pages": count_pages}, headers={"If-Match": etag})
+            if response.status_code == status.HTTP_200_OK:
+                return
+            assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+            conflicts += 1
+
+    await asyncio.gather(*(writer(n) for n in range(WRITERS)))
+
+    async with session_factory() as session:
+        res = await session.execute(select(Book.count_pages, Book.version).where(Book.id == book.id))
+        count_pages, version = res.one()
+    assert count_pages == WRITERS
+    assert version == WRITERS + 1
+    # Без конфликтов тест ничего бы не доказал
+    assert conflicts > 0
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import status
+from sqlalchemy import text
+
+from configurations.database import get_session_factory, global_init
+
+
+# Тест на ручку состояния пула соединений
+@pytest.mark.asyncio
+async def test_pool_stats(async_client):
+    global_init()
+
+    # Ручки в тестах работают на соединении теста, поэтому берем соединение из пула приложения напрямую
+    async with get_session_factory()() as session:
+        await session.execute(text("SELECT 1"))
+
+    response = await async_client.get("/internal/pool")
+    assert response.status_code == status.HTTP_200_OK
+
+    stats = response.json()
+    assert {"size", "checked_in", "checked_out", "overflow", "wait"} <= stats.keys()
+    assert stats["checked_out"] == 0
+    assert stats["wait"]["checkouts"] >= 1
+    assert stats["wait"]["max_wait"] >= stats["wait"]["avg_wait"] >= 0
+
+
+# Пробы живости и готовности
+@pytest.mark.asyncio
+async def test_health(async_client):
+    global_init()
+
+    response = await async_client.get("/health/live")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ok"}
+
+    response = await async_client.get("/health/ready")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "ok"}
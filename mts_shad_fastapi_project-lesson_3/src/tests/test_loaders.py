@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from services.loaders import DataLoader
+
+
+# Загрузки, запрошенные в одном проходе event loop, уходят одной пачкой, повторные ИД не запрашиваются
+@pytest.mark.asyncio
+async def test_data_loader_batches_and_caches():
+    batches = []
+
+    async def batch_load(keys):
+        batches.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = DataLoader(batch_load)
+
+    async def load_one(key):
+        return await loader.load(key)
+
+    results = await asyncio.gather(load_one(1), load_one(2), load_one(1), loader.load_many([3, 2, 4]))
+    assert results == [10, 20, 10, [None, 20, 40]]
+    assert batches == [[1, 2, 3, 4]]
+
+    assert await loader.load(2) == 20
+    assert await loader.load_many([5, 1]) == [50, 10]
+    assert batches == [[1, 2, 3, 4], [5]]
+
+
+# Ошибка пачки получают все ожидающие, и она не кэшируется
+@pytest.mark.asyncio
+async def test_data_loader_error():
+    calls = 0
+
+    async def batch_load(keys):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("db is down")
+        return {key: key for key in keys}
+
+    loader = DataLoader(batch_load)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+    assert await loader.load_many([1, 2]) == [1, 2]
+
+
+# Отмена пачки отменяет ожидающие load и не оставляет их висеть; отмененный load не ломает остальные
+@pytest.mark.asyncio
+async def test_data_loader_cancel():
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def batch_load(keys):
+        started.set()
+        await release.wait()
+        return {key: key for key in keys}
+
+    loader = DataLoader(batch_load)
+    first, second = loader.load(1), loader.load(2)
+    await started.wait()
+    assert len(loader._tasks) == 1
+    task = next(iter(loader._tasks))
+    task.cancel()
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    assert [type(result) for result in results] == [asyncio.CancelledError, asyncio.CancelledError]
+    assert loader._tasks == set()
+
+    waiter = asyncio.ensure_future(loader.load(1))
+    other = loader.load(2)
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    assert await other == 2
+    assert waiter.cancelled()
+    assert await loader.load(1) == 1
@@ -0,0 +1,50 @@
+import logging
+
+import orjson
+import pytest
+
+from configurations.database import global_init
+from configurations.log import JsonFormatter, RequestIdFilter
+from services.request_context import request_id
+
+
+# Запись лога в JSON содержит id запроса и поля, переданные через extra
+def test_json_formatter():
+    record = logging.makeLogRecord(
+        {
+            "name": "routers.v1.books",
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "Deleted book %s",
+            "args": (1,),
+        }
+    )
+    record.route = "DELETE /api/v1/books/{book_id}"
+
+    token = request_id.set("abc123")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id.reset(token)
+
+    data = orjson.loads(JsonFormatter().format(record))
+    assert data["message"] == "Deleted book 1"
+    assert data["level"] == "INFO"
+    assert data["logger"] == "routers.v1.books"
+    assert data["request_id"] == "abc123"
+    assert data["route"] == "DELETE /api/v1/books/{book_id}"
+
+
+# Id запроса берется из заголовка X-Request-ID или генерируется, и возвращается в ответе
+@pytest.mark.asyncio
+async def test_request_id_header(async_client):
+    global_init()
+
+    response = await async_client.get("/metrics", headers={"X-Request-ID": "req-42"})
+    assert response.headers["X-Request-ID"] == "req-42"
+
+    response = await async_client.get("/metrics")
+    assert len(response.headers["X-Request-ID"]) == 32
+
+    response = await async_client.get("/metrics", headers={"X-Request-ID": "x" * 500})
+    assert len(response.headers["X-Request-ID"]) == 32
@@ -0,0 +1,69 @@
+import pytest
+from fastapi import status
+
+from configurations.database import global_init
+from services.metrics import Histogram, Registry
+from src.models import books, sellers
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{prefix} not found in metrics")
+
+
+# Ручка /metrics отдает задержки и коды ответов по шаблону пути ручки и число SQL-запросов на запрос
+@pytest.mark.asyncio
+async def test_metrics_endpoint(db_session, async_client):
+    global_init()
+
+    seller = sellers.Seller(
+        first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000"
+    )
+    db_session.add(seller)
+    await db_session.flush()
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+
+    response = await async_client.get("/metrics")
+    before = response.text
+    route = 'method="GET",route="/api/v1/books/{book_id}"'
+    requests_before = 0.0 if route not in before else _sample(before, f'http_requests_total{{{route},status="200"}}')
+
+    assert (await async_client.get(f"/api/v1/books/{book.id}")).status_code == status.HTTP_200_OK
+    assert (await async_client.get("/api/v1/books/100500")).status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    text = response.text
+    assert _sample(text, f'http_requests_total{{{route},status="200"}}') == requests_before + 1
+    assert _sample(text, f'http_requests_total{{{route},status="404"}}') >= 1
+    assert _sample(text, f"http_request_duration_seconds_count{{{route}}}") >= 2
+    # В гистограмме SQL-запросов на запрос есть запросы, сделавшие ровно один запрос в БД
+    assert _sample(text, f'http_request_db_statements_bucket{{{route},le="1"}}') >= 1
+    assert _sample(text, 'db_statement_duration_seconds_count{operation="SELECT"}') >= 2
+    assert '/api/v1/books/1"' not in text  # в метках только шаблоны путей, без id
+    assert 'db_pool_connections{state="checked_out"}' in text
+    assert 'cache_operations_total{backend="memory",result="misses"}' in text
+
+
+def test_histogram_render():
+    registry = Registry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1)))
+    histogram.observe("/a", value=0.05)
+    histogram.observe("/a", value=0.5)
+    histogram.observe("/a", value=5)
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
@@ -0,0 +1,63 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from tests.conftest import TEST_DATABASE_URL
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+MIGRATIONS_DATABASE_URL = TEST_DATABASE_URL.set(database=f"{TEST_DATABASE_URL.database}_migrations")
+
+
+async def _recreate_database() -> None:
+    engine = create_async_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text(f'DROP DATABASE IF EXISTS "{MIGRATIONS_DATABASE_URL.database}"'))
+            await connection.execute(text(f'CREATE DATABASE "{MIGRATIONS_DATABASE_URL.database}"'))
+    finally:
+        await engine.dispose()
+
+
+# Триггеры и функции сводки продавцов в виде, в каком их хранит Postgres
+async def _seller_stats_triggers(url) -> list[str]:
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as connection:
+            res = await connection.execute(
+                text(
+                    "SELECT pg_get_triggerdef(t.oid) || pg_get_functiondef(t.tgfoid) FROM pg_trigger t "
+                    "WHERE t.tgrelid = 'books_table'::regclass AND NOT t.tgisinternal ORDER BY t.tgname"
+                )
+            )
+            return res.scalars().all()
+    finally:
+        await engine.dispose()
+
+
+def _run_migrations() -> None:
+    asyncio.run(_recreate_database())
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", MIGRATIONS_DATABASE_URL.render_as_string(hide_password=False))
+    config.attributes["configure_logger"] = False
+
+    command.upgrade(config, "head")
+    command.check(config)  # падает, если модели и миграции расходятся
+    # alembic check не видит триггеры: сверяем их с тестовой БД, созданной через create_all (SELLER_STATS_DDL)
+    triggers = asyncio.run(_seller_stats_triggers(MIGRATIONS_DATABASE_URL))
+    assert triggers and triggers == asyncio.run(_seller_stats_triggers(TEST_DATABASE_URL))
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+
+# Миграции на пустой базе дают ту же схему, что описана в моделях, и откатываются до нуля.
+# env.py миграций сам запускает event loop через asyncio.run, поэтому выполняем их в отдельном потоке,
+# чтобы не сбросить цикл событий, общий для остальных тестов.
+def test_migrations_match_models():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(_run_migrations).result()
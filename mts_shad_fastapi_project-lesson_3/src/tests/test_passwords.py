@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from configurations.database import global_init
+from services.passwords import PasswordHasher, get_password_hasher
+from src.models import sellers
+
+
+# Тест на хеширование и проверку пароля
+@pytest.mark.asyncio
+async def test_password_hasher():
+    hasher = PasswordHasher(n=2**10, r=8, p=1, workers=2)
+
+    encoded = await hasher.hash("00000000")
+    assert encoded.startswith("scrypt$1024$8$1$")
+    assert encoded != await hasher.hash("00000000")  # соль у каждого хеша своя
+
+    assert await hasher.verify("00000000", encoded)
+    assert not await hasher.verify("12345678", encoded)
+    assert not await hasher.verify("00000000", "plain-text")
+
+    # Испорченный хеш не совпадает с паролем и не роняет проверку
+    algorithm, n, r, p, salt, key = encoded.split("$")
+    for broken in [
+        f"{algorithm}$x${r}${p}${salt}${key}",
+        f"{algorithm}${n}${r}${p}$not*base64${key}",
+        f"{algorithm}${n}${r}${p}${salt}${key[:-2]}",
+        f"{algorithm}$1000${r}${p}${salt}${key}",
+    ]:
+        assert not await hasher.verify("00000000", broken)
+
+    # Хеш, посчитанный с другой стоимостью, проверяется, но требует пересчета
+    stronger = PasswordHasher(n=2**11, r=8, p=1, workers=1)
+    assert await stronger.verify("00000000", encoded)
+    assert stronger.needs_rehash(encoded)
+    assert not hasher.needs_rehash(encoded)
+
+
+# Тест на то, что пароль продавца сохраняется в виде хеша
+@pytest.mark.asyncio
+async def test_seller_password_is_hashed(db_session, async_client):
+    global_init()
+
+    data = {
+        "first_name": "Alexander",
+        "last_name": "Boytsov",
+        "email": "AlexanderBoytsov@mail.ru",
+        "password": "00000000",
+    }
+    response = await async_client.post("/api/v1/sellers/", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert "password" not in response.json()
+
+    res = await db_session.execute(select(sellers.Seller.password).where(sellers.Seller.id == response.json()["id"]))
+    stored = res.scalar_one()
+    assert stored != "00000000"
+    assert await get_password_hasher().verify("00000000", stored)
@@ -0,0 +1,161 @@
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import status
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import configurations.database as database
+from configurations.replicas import READ_YOUR_WRITES_COOKIE, ReplicaSet
+from configurations.settings import settings
+from models.base import BaseModel
+from models.books import Book
+from models.seller_stats import SellerStats  # noqa F401
+from models.sellers import Seller
+from services.cache import MemoryCache, NullCache, book_key, get_cache, seller_key
+from tests.conftest import TEST_DATABASE_URL
+
+# Репликой служит вторая база на том же сервере. Репликации между базами нет,
+# поэтому по содержимому ответа видно, из какой базы прочитаны данные.
+REPLICA_URL = TEST_DATABASE_URL.set(database=f"{TEST_DATABASE_URL.database}_replica")
+# Адрес, по которому никто не отвечает: такая реплика должна выпасть из ротации
+DEAD_REPLICA_URL = TEST_DATABASE_URL.set(host="127.0.0.1", port=1)
+
+
+# Пересоздаем базу реплики перед каждым тестом. CREATE DATABASE нельзя выполнить в транзакции,
+# поэтому подключаемся к тестовой базе в режиме AUTOCOMMIT.
+@pytest_asyncio.fixture(scope="function")
+async def replica_database():
+    engine = create_async_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(f'DROP DATABASE IF EXISTS "{REPLICA_URL.database}" WITH (FORCE)'))
+        await connection.execute(text(f'CREATE DATABASE "{REPLICA_URL.database}"'))
+    await engine.dispose()
+
+    engine = create_async_engine(REPLICA_URL)
+    async with engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+# Приложение с настоящими сессиями: запись коммитится в тестовую базу, чтение идет на реплику.
+# Кэш выключен, чтобы каждое чтение доходило до БД (тест кэша подставляет свой).
+@pytest_asyncio.fixture(scope="function")
+async def replica_client(monkeypatch, replica_database):
+    from main import app
+
+    monkeypatch.setattr(settings, "db_replica_urls", [REPLICA_URL.render_as_string(False), str(DEAD_REPLICA_URL)])
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", TEST_DATABASE_URL.render_as_string(False))
+    await database.dispose_engine()
+    database.global_init()
+    await database.start_replica_health_checks()
+
+    null_cache = NullCache()
+    app.dependency_overrides[get_cache] = lambda: null_cache
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://127.0.0.1:8000") as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        await database.dispose_engine()
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as connection:
+            await connection.execute(delete(Book))
+            await connection.execute(delete(Seller))
+        await engine.dispose()
+
+
+# Реплики выбираются по кругу, неответившая пропускается, без живых реплик - основная БД
+@pytest.mark.asyncio
+async def test_replica_round_robin(replica_database):
+    engines = [create_async_engine(url) for url in (REPLICA_URL, DEAD_REPLICA_URL, REPLICA_URL)]
+    replicas = ReplicaSet(engines, check_interval=60, check_timeout=2)
+    try:
+        assert [replicas.pick() for _ in range(3)] == [engine.sync_engine for engine in engines]
+
+        await replicas.check()
+        assert [s["healthy"] for s in replicas.stats()] == [True, False, True]
+        assert [replicas.pick() for _ in range(4)] == [engines[0].sync_engine, engines[2].sync_engine] * 2
+
+        replicas._set_healthy(engines[0].sync_engine, False)
+        replicas._set_healthy(engines[2].sync_engine, False)
+        assert replicas.pick() is None
+    finally:
+        await replicas.dispose()
+
+
+# Чтение идет на реплику, а сразу после записи клиент читает из основной БД и видит свою запись
+@pytest.mark.asyncio
+async def test_read_your_writes(replica_client, replica_database):
+    assert [s["healthy"] for s in (await replica_client.get("/internal/replicas")).json()] == [True, False]
+
+    data = {"first_name": "Alexander", "last_name": "Boytsov", "email": "AlexanderBoytsov@mail.ru", "password": "0" * 8}
+    response = await replica_client.post("/api/v1/sellers/", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+    seller_id = response.json()["id"]
+
+    # В окне после записи - основная БД
+    response = await replica_client.get(f"/api/v1/sellers/{seller_id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["first_name"] == "Alexander"
+
+    # Без cookie - реплика, до которой запись не дошла
+    replica_client.cookies.clear()
+    response = await replica_client.get(f"/api/v1/sellers/{seller_id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    async with replica_database.begin() as connection:
+        await connection.execute(
+            insert(Seller).values(
+                id=seller_id, first_name="Replicated", last_name="Boytsov", email="a@mail.ru", password="0"
+            )
+        )
+    for _ in range(3):
+        response = await replica_client.get(f"/api/v1/sellers/{seller_id}")
+        assert response.json()["first_name"] == "Replicated"
+
+    # Истекшее окно - снова реплика
+    replica_client.cookies.set(READ_YOUR_WRITES_COOKIE, "1")
+    response = await replica_client.get(f"/api/v1/sellers/{seller_id}")
+    assert response.json()["first_name"] == "Replicated"
+
+
+# Прочитанное с реплики в кэш не попадает: отстающая реплика не должна возвращать в кэш старые данные
+@pytest.mark.asyncio
+async def test_replica_reads_are_not_cached(replica_client, replica_database):
+    from main import app
+
+    cache = MemoryCache(ttl=60, max_entries=100)
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    data = {"first_name": "Alexander", "last_name": "Boytsov", "email": "AlexanderBoytsov@mail.ru", "password": "0" * 8}
+    seller_id = (await replica_client.post("/api/v1/sellers/", json=data)).json()["id"]
+    data = {"title": "Eugeny Onegin", "author": "Pushkin", "count_pages": 104, "year": 2001, "seller_id": seller_id}
+    book_id = (await replica_client.post("/api/v1/books/", json=data)).json()["id"]
+
+    # Реплика отстает: на ней старые версии продавца и книги
+    async with replica_database.begin() as connection:
+        await connection.execute(
+            insert(Seller).values(
+                id=seller_id, first_name="Stale", last_name="Boytsov", email="a@mail.ru", password="0"
+            )
+        )
+        await connection.execute(
+            insert(Book).values(id=book_id, title="Stale", author="Pushkin", count_pages=1, year=1, seller_id=seller_id)
+        )
+
+    replica_client.cookies.clear()
+    assert (await replica_client.get(f"/api/v1/books/{book_id}")).json()["title"] == "Stale"
+    assert (await replica_client.get(f"/api/v1/sellers/{seller_id}")).json()["first_name"] == "Stale"
+    assert await cache.get(book_key(book_id)) is None
+    assert await cache.get(seller_key(seller_id)) is None
+
+    # Чтение из основной БД кэшируется как обычно, и дальше кэш отдает свежие данные всем клиентам
+    replica_client.cookies.set(READ_YOUR_WRITES_COOKIE, "99999999999")
+    assert (await replica_client.get(f"/api/v1/books/{book_id}")).json()["title"] == "Eugeny Onegin"
+    assert (await replica_client.get(f"/api/v1/sellers/{seller_id}")).json()["first_name"] == "Alexander"
+    replica_client.cookies.clear()
+    assert (await replica_client.get(f"/api/v1/books/{book_id}")).json()["title"] == "Eugeny Onegin"
+    assert (await replica_client.get(f"/api/v1/sellers/{seller_id}")).json()["first_name"] == "Alexander"
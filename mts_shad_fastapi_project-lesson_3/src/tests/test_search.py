@@ -0,0 +1,100 @@
+import orjson
+import pytest
+from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from configurations.database import global_init
+from models.books import Book
+from routers.v1.pagination import PageParams, keyset_query
+from services.search import BookFilters, build_search_query
+from src.models import books, sellers
+
+
+async def _add_seller(db_session, email="AlexanderBoytsov@mail.ru"):
+    seller = sellers.Seller(first_name="Alexander", last_name="Boytsov", email=email, password="00000000")
+    db_session.add(seller)
+    await db_session.flush()
+    return seller
+
+
+# Тест на ручку поиска книг
+@pytest.mark.asyncio
+async def test_search_books(db_session, async_client):
+    global_init()
+
+    seller = await _add_seller(db_session)
+    seller_2 = await _add_seller(db_session, email="IlyaNeustroev@mail.ru")
+    db_session.add_all(
+        [
+            books.Book(author="Pushkin", title="Eugeny Onegin", year=1833, count_pages=104, seller_id=seller.id),
+            books.Book(author="Pushkin", title="Ruslan and Ludmila", year=1820, count_pages=90, seller_id=seller.id),
+            books.Book(author="Lermontov", title="Mziri", year=1839, count_pages=50, seller_id=seller_2.id),
+            books.Book(author="Gogol", title="Dead Souls", year=1842, count_pages=400, seller_id=seller_2.id),
+        ]
+    )
+    await db_session.commit()
+
+    async def titles(**params):
+        response = await async_client.get("/api/v1/books/search", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        return [book["title"] for book in response.json()["books"]]
+
+    assert await titles(author="push") == ["Eugeny Onegin", "Ruslan and Ludmila"]
+    assert await titles(title="m") == ["Mziri"]
+    assert await titles(title="%") == []
+    assert await titles(q="souls") == ["Dead Souls"]
+    assert await titles(q="ludmila ruslan") == ["Ruslan and Ludmila"]
+    assert await titles(year_from=1830, year_to=1840) == ["Eugeny Onegin", "Mziri"]
+    assert await titles(seller_id=seller_2.id, year_from=1840) == ["Dead Souls"]
+    assert await titles(author="Pushkin", limit=1) == ["Eugeny Onegin"]
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+# На большой таблице каждый вид фильтра должен идти через свой индекс: не полным просмотром таблицы
+# и не просмотром первичного ключа в порядке страницы с отбрасыванием строк по фильтру.
+@pytest.mark.asyncio
+async def test_search_uses_indexes(db_session):
+    seller = await _add_seller(db_session)
+    # 200 тысяч книг генерируем на стороне БД, чтобы не гонять их через драйвер
+    await db_session.execute(
+        text(
+            "INSERT INTO books_table (title, author, year, count_pages, seller_id) "
+            "SELECT 'Title ' || lpad(i::text, 6, '0'), 'Author ' || lpad((i % 1000)::text, 3, '0'), "
+            "1900 + i % 120, 100, :seller_id FROM generate_series(1, 200000) AS i"
+        ),
+        {"seller_id": seller.id},
+    )
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE books_table"))
+
+    cases = [
+        (BookFilters(title="Title 01234"), "ix_books_table_title_trgm"),
+        (BookFilters(author="Author 042"), "ix_books_table_author_trgm"),
+        (BookFilters(q="001234"), "ix_books_table_search_vector"),
+        (BookFilters(year_from=1950, year_to=1950), "ix_books_table_year_id"),
+        (BookFilters(seller_id=seller.id + 1), "ix_books_table_seller_id_year_id"),
+        (BookFilters(seller_id=seller.id, year_from=1950, year_to=1950), "ix_books_table_seller_id_year_id"),
+    ]
+    # Первая страница и страница после курсора
+    for page in (PageParams(limit=100, after=None), PageParams(limit=100, after=150000)):
+        for filters, index in cases:
+            query = build_search_query(keyset_query(Book, page), filters)
+            sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            res = await db_session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = res.scalar_one()
+            plan = (orjson.loads(plan) if isinstance(plan, (str, bytes)) else plan)[0]["Plan"]
+            nodes = list(_plan_nodes(plan))
+            scans = [(node["Node Type"], node.get("Index Name"), "Filter" in node) for node in nodes]
+            assert index in [node.get("Index Name") for node in nodes], (vars(filters), page, scans)
+            assert not any(node["Node Type"] == "Seq Scan" for node in nodes), (vars(filters), page, scans)
+            assert not any(node.get("Index Name") == "books_table_pkey" and "Filter" in node for node in nodes), (
+                vars(filters),
+                page,
+                scans,
+            )
@@ -0,0 +1,176 @@
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from configurations.database import global_init
+from src.models import books, sellers
+from src.models.seller_stats import SellerStats
+
+
+async def _fill_db(db_session):
+    seller = sellers.Seller(
+        first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000"
+    )
+    seller_2 = sellers.Seller(
+        first_name="Ilya", last_name="Neustroev", email="IlyaNeustroev@mail.ru", password="12345678"
+    )
+    seller_3 = sellers.Seller(first_name="Fedor", last_name="Dostoevsky", email="Fedor@mail.ru", password="12345678")
+    db_session.add_all([seller, seller_2, seller_3])
+    await db_session.commit()
+    return seller, seller_2, seller_3
+
+
+# Сводка, посчитанная заново по books_table, должна совпадать с поддерживаемой триггерами
+async def _assert_stats_consistent(db_session):
+    expected = await db_session.execute(
+        select(
+            books.Book.seller_id,
+            func.count(),
+            func.sum(books.Book.count_pages),
+            func.min(books.Book.year),
+            func.max(books.Book.year),
+        ).group_by(books.Book.seller_id)
+    )
+    actual = await db_session.execute(
+        select(
+            SellerStats.seller_id,
+            SellerStats.books_count,
+            SellerStats.total_pages,
+            SellerStats.min_year,
+            SellerStats.max_year,
+        ).where(SellerStats.books_count > 0)
+    )
+    assert sorted(map(tuple, actual)) == sorted(map(tuple, expected))
+
+
+# Тест на статистику продавца: сводка меняется вместе с книгами
+@pytest.mark.asyncio
+async def test_seller_stats(db_session, async_client):
+    global_init()
+
+    seller, seller_2, _ = await _fill_db(db_session)
+
+    # У продавца без книг статистика нулевая
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}/stats")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "seller_id": seller.id,
+        "books_count": 0,
+        "total_pages": 0,
+        "min_year": None,
+        "max_year": None,
+    }
+
+    data = [
+        {"title": "Eugeny Onegin", "author": "Pushkin", "count_pages": 104, "year": 2001, "seller_id": seller.id},
+        {"title": "Mziri", "author": "Lermontov", "count_pages": 50, "year": 1997, "seller_id": seller.id},
+        {"title": "Viy", "author": "Gogol", "count_pages": 80, "year": 2010, "seller_id": seller_2.id},
+    ]
+    response = await async_client.post("/api/v1/books/bulk", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    book_ids = [book["id"] for book in response.json()["books"]]
+
+    response = await async_client.post(
+        "/api/v1/books/",
+        json={"title": "Idiot", "author": "Dostoevsky", "count_pages": 500, "year": 1999, "seller_id": seller.id},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}/stats")
+    assert response.json() == {
+        "seller_id": seller.id,
+        "books_count": 3,
+        "total_pages": 654,
+        "min_year": 1997,
+        "max_year": 2001,
+    }
+    await _assert_stats_consistent(db_session)
+
+    # Изменение полей, не входящих в сводку, ее не трогает
+    response = await async_client.patch(f"/api/v1/books/{book_ids[0]}", json={"title": "Poltava"})
+    assert response.status_code == status.HTTP_200_OK
+    await _assert_stats_consistent(db_session)
+
+    # Книга с минимальным годом переходит к другому продавцу
+    response = await async_client.patch(
+        f"/api/v1/books/{book_ids[1]}", json={"seller_id": seller_2.id, "count_pages": 60}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}/stats")
+    assert response.json() == {
+        "seller_id": seller.id,
+        "books_count": 2,
+        "total_pages": 604,
+        "min_year": 1999,
+        "max_year": 2001,
+    }
+    response = await async_client.get(f"/api/v1/sellers/{seller_2.id}/stats")
+    assert response.json() == {
+        "seller_id": seller_2.id,
+        "books_count": 2,
+        "total_pages": 140,
+        "min_year": 1997,
+        "max_year": 2010,
+    }
+    await _assert_stats_consistent(db_session)
+
+    # Удаление книги с максимальным годом
+    response = await async_client.request("DELETE", "/api/v1/books/bulk", json=[book_ids[0], book_ids[2]])
+    assert response.status_code == status.HTTP_200_OK
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}/stats")
+    assert response.json() == {
+        "seller_id": seller.id,
+        "books_count": 1,
+        "total_pages": 500,
+        "min_year": 1999,
+        "max_year": 1999,
+    }
+    await _assert_stats_consistent(db_session)
+
+    # Удаление продавца удаляет и его сводку
+    response = await async_client.delete(f"/api/v1/sellers/{seller.id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}/stats")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    await _assert_stats_consistent(db_session)
+
+
+# Тест на рейтинг продавцов
+@pytest.mark.asyncio
+async def test_leaderboard(db_session, async_client):
+    global_init()
+
+    seller, seller_2, seller_3 = await _fill_db(db_session)
+    db_session.add_all(
+        [
+            books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=100, seller_id=seller.id),
+            books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=100, seller_id=seller.id),
+            books.Book(author="Tolstoy", title="War and Peace", year=2005, count_pages=1300, seller_id=seller_2.id),
+        ]
+    )
+    await db_session.commit()
+
+    response = await async_client.get("/api/v1/sellers/leaderboard")
+    assert response.status_code == status.HTTP_200_OK
+    # Продавцы без книг в рейтинг не попадают
+    assert [(s["seller_id"], s["books_count"]) for s in response.json()["sellers"]] == [
+        (seller.id, 2),
+        (seller_2.id, 1),
+    ]
+    assert response.json()["sellers"][0]["first_name"] == "Alexander"
+
+    response = await async_client.get("/api/v1/sellers/leaderboard", params={"by": "total_pages", "limit": 1})
+    assert response.json()["sellers"] == [
+        {
+            "seller_id": seller_2.id,
+            "first_name": "Ilya",
+            "last_name": "Neustroev",
+            "books_count": 1,
+            "total_pages": 1300,
+            "min_year": 2005,
+            "max_year": 2005,
+        }
+    ]
+
+    response = await async_client.get("/api/v1/sellers/leaderboard", params={"by": "password"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,40 @@
+import os
+
+from configurations import database
+from configurations.database import global_init
+from server import parse_args, uvicorn_options
+
+
+# Параметры uvicorn собираются из настроек и аргументов командной строки
+def test_uvicorn_options():
+    options = uvicorn_options(
+        parse_args(["--workers", "3", "--backlog", "4096", "--keep-alive", "10", "--limit-concurrency", "500"])
+    )
+    assert options["workers"] == 3
+    assert options["backlog"] == 4096
+    assert options["timeout_keep_alive"] == 10
+    assert options["limit_concurrency"] == 500
+    assert options["loop"] in ("uvloop", "asyncio")
+    assert options["http"] in ("httptools", "h11")
+
+    options = uvicorn_options(parse_args(["--workers", "0", "--limit-concurrency", "0"]))
+    assert options["workers"] >= 1
+    assert options["limit_concurrency"] is None
+
+
+# После fork дочерний процесс не использует движок (и соединения пула) родителя
+def test_engine_is_reset_after_fork():
+    global_init()
+    parent_factory = database.get_session_factory()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            database.get_session_factory()
+        except ValueError:
+            os._exit(0)
+        os._exit(1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert database.get_session_factory() is parent_factory
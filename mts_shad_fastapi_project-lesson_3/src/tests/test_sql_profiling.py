@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+from fastapi import status
+
+from configurations.database import global_init
+from configurations.settings import settings
+from services.sql_profiling import redact_parameters
+from src.models import books, sellers
+
+
+async def _add_book(db_session):
+    seller = sellers.Seller(
+        first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000"
+    )
+    db_session.add(seller)
+    await db_session.flush()
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    db_session.add(book)
+    await db_session.commit()
+    return book
+
+
+# По заголовку X-Profile-SQL ответ содержит число SQL-запросов и их время, без заголовка - нет
+@pytest.mark.asyncio
+async def test_profiling_header(db_session, async_client):
+    global_init()
+    book = await _add_book(db_session)
+
+    response = await async_client.get(f"/api/v1/books/{book.id}", headers={"X-Profile-SQL": "1"})
+    assert response.status_code == status.HTTP_200_OK
+    # В тестах сессия ручки работает через SAVEPOINT, эти запросы тоже попадают в подсчет
+    assert int(response.headers["X-SQL-Statements"]) >= 1
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert "db;dur=" in timing
+    assert 'desc="1 SELECT"' in timing
+
+    response = await async_client.get("/api/v1/books/")
+    assert "Server-Timing" not in response.headers
+    assert "X-SQL-Statements" not in response.headers
+
+
+# Медленные запросы пишутся в лог вместе с ручкой, а значения параметров скрываются
+@pytest.mark.asyncio
+async def test_slow_query_log(db_session, async_client, caplog, monkeypatch):
+    global_init()
+    book = await _add_book(db_session)
+
+    monkeypatch.setattr(settings, "db_slow_query_threshold", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="services.sql_profiling"):
+        response = await async_client.get("/api/v1/books/search", params={"title": "Eugeny"})
+    assert response.status_code == status.HTTP_200_OK
+
+    records = [record for record in caplog.records if "books_table" in record.getMessage()]
+    assert len(records) == 1
+    assert records[0].route == "GET /api/v1/books/search"
+    assert "<str len=" in records[0].getMessage()
+    assert "Eugeny" not in records[0].getMessage()
+    assert book.id
+
+
+def test_redact_parameters():
+    assert redact_parameters(("secret", 1, None)) == ["<str len=6>", "<int>", None]
+    assert redact_parameters({"password": "secret"}) == {"password": "<str len=6>"}
+    assert redact_parameters([("a", 1), ("b", 2)]) == {"rows": 2, "first": ["<str len=1>", "<int>"]}
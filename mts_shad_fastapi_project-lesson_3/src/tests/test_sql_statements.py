@@ -0,0 +1,144 @@
+import orjson
+import pytest
+from fastapi import status
+
+from configurations.database import global_init
+from schemas.sellers import ReturnedSellerAndBooks
+from services.cache import get_cache
+from src.models import books, sellers
+
+
+# Наполняем БД: продавец с двумя книгами и продавец без книг
+async def _fill_db(db_session):
+    seller = sellers.Seller(
+        first_name="Alexander", last_name="Boytsov", email="AlexanderBoytsov@mail.ru", password="00000000"
+    )
+    seller_2 = sellers.Seller(
+        first_name="Ilya", last_name="Neustroev", email="IlyaNeustroev@mail.ru", password="12345678"
+    )
+    db_session.add_all([seller, seller_2])
+    await db_session.flush()
+
+    book = books.Book(author="Pushkin", title="Eugeny Onegin", year=2001, count_pages=104, seller_id=seller.id)
+    book_2 = books.Book(author="Lermontov", title="Mziri", year=1997, count_pages=104, seller_id=seller.id)
+    db_session.add_all([book, book_2])
+    await db_session.commit()
+
+    return seller, book
+
+
+# Каждая ручка чтения должна укладываться в фиксированное число запросов,
+# независимо от количества связанных записей.
+@pytest.mark.asyncio
+async def test_read_endpoints_statement_count(db_session, async_client, sql_statements):
+    global_init()
+
+    seller, book = await _fill_db(db_session)
+
+    # Прогреваем соединение, чтобы служебные запросы драйвера не попали в подсчет
+    await async_client.get(f"/api/v1/books/{book.id}")
+
+    expected = {
+        "/api/v1/books/": 1,
+        f"/api/v1/books/{book.id}": 1,
+        f"/api/v1/books/batch?ids={book.id}&ids={book.id + 1}&ids=100500": 1,
+        f"/api/v1/sellers/batch?ids={seller.id}&ids={seller.id + 1}": 1,
+        "/api/v1/sellers/": 1,
+        f"/api/v1/sellers/{seller.id}": 1,
+    }
+    for url, count in expected.items():
+        await get_cache().clear()
+        sql_statements.clear()
+        response = await async_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(sql_statements) == count, (url, sql_statements)
+
+    # Повторное чтение карточек отдается из кэша без обращения к БД
+    await async_client.get(f"/api/v1/books/{book.id}")
+    sql_statements.clear()
+    await async_client.get(f"/api/v1/books/{book.id}")
+    await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert sql_statements == []
+
+
+# Продавец с книгами отдается одним запросом, без загрузки ORM-графа
+@pytest.mark.asyncio
+async def test_get_seller_with_books(db_session, async_client, sql_statements):
+    global_init()
+
+    seller, book = await _fill_db(db_session)
+
+    sql_statements.clear()
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(sql_statements) == 1
+    assert response.json() == {
+        "first_name": "Alexander",
+        "last_name": "Boytsov",
+        "email": "AlexanderBoytsov@mail.ru",
+        "id": seller.id,
+        "books": [
+            {"title": "Eugeny Onegin", "author": "Pushkin", "year": 2001, "seller_id": seller.id},
+            {"title": "Mziri", "author": "Lermontov", "year": 1997, "seller_id": seller.id},
+        ],
+    }
+    assert response.headers["x-books-total"] == "2"
+
+    # Карточку собирает БД, а ответ совпадает байт в байт с ответом через схему ReturnedSellerAndBooks
+    assert response.content == orjson.dumps(ReturnedSellerAndBooks.model_validate_json(response.content).model_dump())
+
+    # Урезанная карточка: первые книги по ИД, полное число книг в заголовке, свой ETag
+    etag = response.headers["etag"]
+    sql_statements.clear()
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}", params={"books_limit": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(sql_statements) == 1
+    assert [book["title"] for book in response.json()["books"]] == ["Eugeny Onegin"]
+    assert response.headers["x-books-total"] == "2"
+    assert response.headers["etag"] != etag
+
+    response = await async_client.get(f"/api/v1/sellers/{seller.id}", params={"books_limit": 0})
+    assert response.json()["books"] == []
+
+    response = await async_client.get("/api/v1/sellers/100500")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+# Частичное обновление - один UPDATE ... RETURNING без предварительного SELECT
+@pytest.mark.asyncio
+async def test_patch_statement_count(db_session, async_client, sql_statements):
+    global_init()
+
+    seller, book = await _fill_db(db_session)
+    await async_client.get(f"/api/v1/books/{book.id}")
+
+    for url, data in [
+        (f"/api/v1/books/{book.id}", {"title": "Viy"}),
+        (f"/api/v1/books/{book.id}", {"seller_id": seller.id, "year": 2002}),
+        (f"/api/v1/sellers/{seller.id}", {"first_name": "Ilya"}),
+    ]:
+        sql_statements.clear()
+        response = await async_client.patch(url, json=data)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(sql_statements) == 1, (url, sql_statements)
+        assert sql_statements[0].startswith("UPDATE")
+
+
+# Удаление книги, пачки книг и продавца с книгами - по одному DELETE ... RETURNING
+@pytest.mark.asyncio
+async def test_delete_statement_count(db_session, async_client, sql_statements):
+    global_init()
+
+    seller, book = await _fill_db(db_session)
+    await async_client.get(f"/api/v1/books/{book.id}")
+
+    for method, url, data in [
+        ("DELETE", f"/api/v1/books/{book.id}", None),
+        ("DELETE", "/api/v1/books/bulk", [book.id + 1, 100500]),
+        ("DELETE", f"/api/v1/sellers/{seller.id}", None),
+    ]:
+        sql_statements.clear()
+        response = await async_client.request(method, url, json=data)
+        assert response.status_code in (status.HTTP_200_OK, status.HTTP_204_NO_CONTENT)
+        assert len(sql_statements) == 1, (url, sql_statements)
+        assert sql_statements[0].startswith("DELETE")